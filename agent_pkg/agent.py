@@ -1,8 +1,11 @@
+import asyncio
 from modules.inventory import InventoryModule
 from modules.sales import SalesModule
 from modules.hr import HRModule
 from modules.planner import PlannerModule
-from utils.helpers import log_event
+from utils.logging import log_event
+from utils.kpi import KPIEngine
+from utils.dispatch import DispatchTable
 from memory.session_service import SessionService
 from memory.memory_bank import MemoryBank
 
@@ -20,6 +23,7 @@ class ERPAgent:
         """
         self.name = name
         self.modules = modules
+        self.dispatch = DispatchTable(modules)
         self.tool_coordinator = tool_coordinator
         self.session = session or SessionService()
         self.memory = memory or MemoryBank()
@@ -35,68 +39,217 @@ class ERPAgent:
 
     def decide(self):
         """Decide actions based on perceived data and planner goals."""
-        actions = []
-
         if not self.perceived_data:
             return []
 
-        if "low_stock_item" in self.perceived_data:
-            item = self.perceived_data["low_stock_item"]
+        actions = self._plan(self.perceived_data)
+
+        self.actions = actions
+        self.session.set("last_actions", actions)
+        self.memory.add_record(self.name, "decide", {"actions": actions})
+        log_event({"agent": self.name, "event": "decide", "actions": actions})
+        return actions
+
+    def _plan(self, data: dict):
+        """Map one perception dict to the list of (module, action, params) to run."""
+        actions = []
+
+        if "low_stock_item" in data:
+            item = data["low_stock_item"]
             actions.append(("inventory", "restock_item", {"item_id": item}))
 
-        if "new_order" in self.perceived_data:
-            order = self.perceived_data["new_order"]
+        if "restock_threshold" in data:
+            # One vectorized pass restocks every item below the threshold
+            threshold = data["restock_threshold"]
+            actions.append(("inventory", "restock_below", {"threshold": threshold}))
+
+        if "new_order" in data:
+            order = data["new_order"]
             actions.append(("sales", "process_order", {"order": order}))
 
-        if "new_employee" in self.perceived_data:
-            employee = self.perceived_data["new_employee"]
+        if "new_employee" in data:
+            employee = data["new_employee"]
             actions.append(("hr", "add_employee", {"employee": employee}))
 
         actions.append(("planner", "review_goals", {}))
+        return actions
+
+    def act(self, actions: list):
+        """Execute planned actions across modules or tools."""
+        results = [(module_name, self._execute(module_name, action, params))
+                   for module_name, action, params in actions]
+
+        self.session.set("last_results", results)
+        self.memory.add_record(self.name, "act", {"results": results})
+        log_event({"agent": self.name, "event": "act", "results": results})
+        return results
+
+    def _execute(self, module_name: str, action: str, params: dict):
+        """Run a single action and return its result."""
+        # If tool coordinator is provided, try tools first
+        if self.tool_coordinator and module_name in self.tool_coordinator.tools:
+            return self.tool_coordinator._run_task(module_name, action, params)
+
+        # Otherwise fallback to ERP modules
+        try:
+            handler = self.dispatch.table[module_name][action]
+        except KeyError:
+            handler = None
+        # The module may have been replaced or removed since the handler was bound
+        if handler is None or handler.owner is not self.modules.get(module_name):
+            handler = self.dispatch.lookup(module_name, action)
+            if handler is None:
+                return self._not_found(module_name, action)
+        try:
+            return handler.func(**params)
+        except TypeError:
+            # Only a binding failure is a parameter mismatch; TypeErrors raised inside propagate
+            error = handler.check(params)
+            if error:
+                return f"Parameter mismatch: {error}"
+            raise
+
+    def _not_found(self, module_name: str, action: str):
+        if not self.modules.get(module_name):
+            return "Module not found"
+        return f"Action {action} not implemented"
+
+    def _remember(self, session: SessionService, key: str, value, event: str, record: dict):
+        """Store a cycle step in the session and the memory bank."""
+        session.set(key, value)
+        self.memory.add_record(self.name, event, record)
+
+    async def aperceive(self, data: dict, session: SessionService = None):
+        """
+        Async variant of perceive. Session sizing and memory writes (disk appends and
+        eviction with a durable backend) run in the default executor; log_event does no I/O.
+        :param session: per-caller session to use instead of the agent's own
+        """
+        self.perceived_data = data
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._remember, session or self.session, "last_perception", data, "perceive", data)
+        log_event({"agent": self.name, "event": "perceive", "data": data})
+
+    async def adecide(self, data: dict = None, session: SessionService = None):
+        """
+        Async variant of decide.
+        :param data: perception to plan for; defaults to the last perceived data. Passing it
+                     explicitly keeps concurrent cycles on a shared agent independent.
+        :param session: per-caller session to use instead of the agent's own
+        """
+        data = self.perceived_data if data is None else data
+        if not data:
+            return []
+
+        actions = self._plan(data)
 
         self.actions = actions
-        self.session.set("last_actions", actions)
-        self.memory.add_record(self.name, "decide", {"actions": actions})
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._remember, session or self.session, "last_actions", actions, "decide", {"actions": actions})
         log_event({"agent": self.name, "event": "decide", "actions": actions})
         return actions
 
-    def act(self, actions: list):
-        """Execute planned actions across modules or tools."""
+    async def aact(self, actions: list, session: SessionService = None):
+        """
+        Async variant of act; synchronous module and tool methods run in the default executor.
+        :param session: per-caller session to use instead of the agent's own
+        """
+        loop = asyncio.get_running_loop()
         results = []
         for module_name, action, params in actions:
-            # If tool coordinator is provided, try tools first
-            if self.tool_coordinator and module_name in self.tool_coordinator.tools:
-                result = self.tool_coordinator._run_task(module_name, action, params)
-                results.append((module_name, result))
-                continue
-
-            # Otherwise fallback to ERP modules
-            module = self.modules.get(module_name)
-            if not module:
-                results.append((module_name, "Module not found"))
-                continue
-
-            method = getattr(module, action, None)
-            if callable(method):
-                try:
-                    result = method(**params)
-                except TypeError as e:
-                    result = f"Parameter mismatch: {e}"
-                results.append((module_name, result))
-            else:
-                results.append((module_name, f"Action {action} not implemented"))
+            result = await loop.run_in_executor(None, self._execute, module_name, action, params)
+            results.append((module_name, result))
 
-        self.session.set("last_results", results)
-        self.memory.add_record(self.name, "act", {"results": results})
+        await loop.run_in_executor(
+            None, self._remember, session or self.session, "last_results", results, "act", {"results": results})
         log_event({"agent": self.name, "event": "act", "results": results})
         return results
 
+    async def arun_cycle(self, data: dict, session: SessionService = None):
+        """Run one async perceive/decide/act cycle for the given data."""
+        await self.aperceive(data, session)
+        actions = await self.adecide(data, session)
+        return await self.aact(actions if isinstance(actions, list) else [], session)
+
+    def perceive_batch(self, events: list):
+        """Receive a list of perception dicts to be handled as one batch."""
+        self.perceived_data = list(events)
+        return self.perceived_data
+
+    def decide_batch(self, events: list = None):
+        """Plan actions for every event of a batch, one action list per event."""
+        events = self.perceived_data if events is None else events
+        return [self._plan(data) if data else [] for data in events or []]
+
+    def act_batch(self, actions_per_event: list):
+        """
+        Execute the actions of a whole batch.
+        Actions are grouped by (module, action) in order of first appearance, and a
+        group is handed to the module's `<action>_batch(params_list)` entry point when
+        it defines one. Results are returned per event, in input order.
+        """
+        results = [[None] * len(actions) for actions in actions_per_event]
+        groups = {}
+        for i, actions in enumerate(actions_per_event):
+            for j, (module_name, action, params) in enumerate(actions):
+                groups.setdefault((module_name, action), []).append((i, j, params))
+
+        for (module_name, action), entries in groups.items():
+            params_list = [params for _, _, params in entries]
+            for (i, j, _), result in zip(entries, self._run_group(module_name, action, params_list)):
+                results[i][j] = (module_name, result)
+        return results
+
+    def _run_group(self, module_name: str, action: str, params_list: list):
+        """Run one (module, action) group, using a bulk entry point when available."""
+        if self.tool_coordinator and module_name in self.tool_coordinator.tools:
+            return [self.tool_coordinator._run_task(module_name, action, params) for params in params_list]
+
+        bulk = self.dispatch.lookup(module_name, f"{action}_batch")
+        if bulk is not None:
+            return bulk.func(params_list)
+
+        handler = self.dispatch.lookup(module_name, action)
+        if handler is None:
+            return [self._not_found(module_name, action)] * len(params_list)
+
+        group_results = []
+        for params in params_list:
+            try:
+                group_results.append(handler.func(**params))
+            except TypeError:
+                error = handler.check(params)
+                if error is None:
+                    raise
+                group_results.append(f"Parameter mismatch: {error}")
+        return group_results
+
+    def run_batch(self, events: list):
+        """
+        Run a full perceive/decide/act cycle over a list of events.
+        Writes a single session entry, memory record and log record for the batch.
+        :param events: list of perception dicts
+        :return: list of per-event result lists, in input order
+        """
+        self.perceive_batch(events)
+        actions = self.decide_batch()
+        results = self.act_batch(actions)
+
+        self.actions = actions
+        self.session.set("last_batch", {"events": self.perceived_data, "actions": actions, "results": results})
+        self.memory.add_record(self.name, "run_batch", {"events": self.perceived_data,
+                                                         "actions": actions, "results": results})
+        log_event({"agent": self.name, "event": "run_batch", "size": len(actions), "actions": actions,
+                   "results": results})
+        return results
+
 
 if __name__ == "__main__":
     # Initialize ERP modules
-    inventory = InventoryModule()
-    sales = SalesModule()
-    hr = HRModule()
+    kpi = KPIEngine()
+    inventory = InventoryModule(kpi=kpi)
+    sales = SalesModule(inventory=inventory, kpi=kpi)
+    hr = HRModule(kpi=kpi)
     planner = PlannerModule()
 
     # Add initial example goals
@@ -134,3 +287,4 @@ if __name__ == "__main__":
     print("Execution Results:", results)
     print("Session State:", agent.session.all())
     print("Memory Records:", agent.memory.all())
+    print("KPIs:", kpi.snapshot())
@@ -1,10 +1,40 @@
-from utils.helpers import log_event
+from utils.logging import log_event
+from memory.session_service import SessionStore
+import asyncio
 import concurrent.futures
+import threading
 
 
 class AgentManager:
-    def __init__(self, agents: list):
+    def __init__(self, agents: list, max_concurrency: int = 32, session_store: SessionStore = None):
+        """
+        :param agents: list of agents to coordinate
+        :param max_concurrency: maximum number of agent cycles run_async or run_parallel keeps in flight
+        :param session_store: optional store giving each caller session its own agent state
+        """
         self.agents = agents
+        self.max_concurrency = max_concurrency
+        self.session_store = session_store
+        self._semaphore = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Worker pool for run_parallel, created on first use and reused afterwards."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.max_concurrency, thread_name_prefix="agent")
+        return self._executor
+
+    def shutdown(self, wait: bool = True):
+        """Stop the run_parallel worker pool; a later call re-creates it."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
 
     def run_sequential(self, data: dict):
         results = {}
@@ -16,14 +46,9 @@ class AgentManager:
         return results
 
     def run_parallel(self, data: dict):
-        results = {}
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_map = {
-                executor.submit(self._run_agent_cycle, agent, data): agent.name
-                for agent in self.agents
-            }
-            for future in concurrent.futures.as_completed(future_map):
-                results[future_map[future]] = future.result()
+        futures = [self.executor.submit(self._run_agent_cycle, agent, data) for agent in self.agents]
+        # Keyed in agent order, whatever order the cycles finish in
+        results = {agent.name: future.result() for agent, future in zip(self.agents, futures)}
         log_event({"event": "run_parallel", "results": results})
         return results
 
@@ -37,6 +62,30 @@ class AgentManager:
         log_event({"event": "run_loop", "results": results})
         return results
 
+    async def run_async(self, data: dict, session_id: str = None):
+        """
+        Run every agent's cycle concurrently on the event loop.
+        Cycles across all callers are bounded by a shared semaphore of max_concurrency.
+        :param session_id: caller/tenant id; with a session_store, each agent uses that caller's session
+        """
+        names = [agent.name for agent in self.agents]
+        cycles = await asyncio.gather(*(self._run_agent_cycle_async(agent, data, session_id)
+                                        for agent in self.agents))
+        results = dict(zip(names, cycles))
+        log_event({"event": "run_async", "results": results})
+        return results
+
+    async def _run_agent_cycle_async(self, agent, data, session_id=None):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            if hasattr(agent, "arun_cycle"):
+                session = None
+                if self.session_store is not None and session_id is not None:
+                    session = self.session_store.session(f"{session_id}/{agent.name}")
+                return await agent.arun_cycle(data, session)
+            return await asyncio.to_thread(self._run_agent_cycle, agent, data)
+
     def _run_agent_cycle(self, agent, data):
         agent.perceive(data)
         actions = agent.decide()
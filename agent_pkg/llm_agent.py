@@ -2,7 +2,7 @@ import re
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from utils.helpers import log_event
+from utils.logging import log_event
 
 
 #Simple Tokenizer
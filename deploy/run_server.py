@@ -7,6 +7,7 @@ from agent_pkg.agent_manager import AgentManager
 from agent_pkg.agent import ERPAgent
 from tools.mcp import ToolCoordinator
 from tools.custom_tools import InventoryTool, SalesTool, HRTool
+from memory.session_service import SessionStore
 
 app = FastAPI(title="Multi-Agent ERP System")
 
@@ -20,16 +21,31 @@ tools = {
 
 tool_coordinator = ToolCoordinator(tools)
 agent = ERPAgent(name="ERP-1", modules=modules, tool_coordinator=tool_coordinator)
-manager = AgentManager([agent])
+sessions = SessionStore()
+manager = AgentManager([agent], session_store=sessions)
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    sessions.start_sweeper()
+
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    sessions.stop_sweeper()
+    tool_coordinator.shutdown(cancel_pending=True)
+    manager.shutdown()
 
 
 @app.post("/run")
 async def run_agent(request: Request):
     data = await request.json()
-    results = manager.run_sequential(data)
+    # Callers identify their session/tenant with the X-Session-Id header
+    session_id = request.headers.get("X-Session-Id", "default")
+    results = await manager.run_async(data, session_id=session_id)
     return {"results": results}
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok"}
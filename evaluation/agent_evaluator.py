@@ -5,6 +5,8 @@ Functions to assess goal completion, efficiency, and errors for ERP agents.
 
 import statistics
 import datetime
+from collections import Counter
+from memory.memory_bank import MemoryBank
 
 
 class AgentEvaluator:
@@ -61,9 +63,7 @@ class AgentEvaluator:
         :param memory_records: list of memory entries
         :return: dict with error count and examples
         """
-        errors = [r for r in memory_records if "error" in str(r["data"]).lower()
-                  or "not found" in str(r["data"]).lower()
-                  or "mismatch" in str(r["data"]).lower()]
+        errors = [r for r in memory_records if self._is_error(r)]
 
         error_report = {
             "agent": agent_name,
@@ -73,6 +73,42 @@ class AgentEvaluator:
         self.reports.append(error_report)
         return error_report
 
+    @staticmethod
+    def _is_error(record: dict):
+        return MemoryBank.is_error(record["data"])
+
+    def evaluate_history(self, agent_name: str, memory_bank, since=None, until=None):
+        """
+        Summarize an agent's full history, combining rollups of evicted records
+        with the raw records still retained by the MemoryBank.
+        :param agent_name: name of the agent
+        :param memory_bank: MemoryBank instance
+        :param since: optional datetime or ISO string lower bound
+        :param until: optional datetime or ISO string upper bound
+        :return: dict with per-event counts, error count and action histogram
+        """
+        events = Counter()
+        actions = Counter()
+        errors = 0
+        for rollup in memory_bank.get_rollups(agent_name, since=since, until=until):
+            events[rollup["event"]] += rollup["count"]
+            errors += rollup["errors"]
+            actions.update(rollup["actions"])
+
+        for r in memory_bank.get_records(agent_name, since=since, until=until, stream=True):
+            events[r["event"]] += 1
+            errors += self._is_error(r)
+            actions.update(memory_bank.action_names(r["data"]))
+
+        history = {
+            "agent": agent_name,
+            "event_counts": dict(events),
+            "error_count": errors,
+            "action_histogram": dict(actions)
+        }
+        self.reports.append(history)
+        return history
+
     def full_report(self):
         """Return all accumulated evaluation reports."""
         return self.reports
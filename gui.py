@@ -5,7 +5,7 @@ from modules.planner import PlannerModule
 from modules.inventory import InventoryModule
 from modules.sales import SalesModule
 from modules.hr import HRModule
-from utils.helpers import log_event
+from utils.logging import log_event
 from agent_pkg.agent import ERPAgent
 
 
@@ -16,7 +16,7 @@ class ERPApp:
 
         # Initialize ERP modules
         self.inventory = InventoryModule()
-        self.sales = SalesModule()
+        self.sales = SalesModule(inventory=self.inventory)
         self.hr = HRModule()
         # Planner with configurable similarity threshold
         self.planner = PlannerModule(similarity_threshold=0.5)
@@ -79,20 +79,27 @@ class ERPApp:
         """Load goals from saved_goals.txt if it exists, deduplicated via planner."""
         if os.path.exists("saved_goals.txt"):
             with open("saved_goals.txt", "r", encoding="utf-8") as f:
-                for line in f:
-                    parts = line.strip().split("|")
-                    if len(parts) == 2:
-                        goal, priority = parts
-                        try:
-                            priority = int(priority)
-                        except ValueError:
-                            priority = 1
-                        self.planner.add_goal(goal, priority)
+                self.planner.add_goals(self._parse_goal_lines(f))
         else:
             # Add some default example goals if no file exists
-            self.planner.add_goal("Improve inventory management", priority=3)
-            self.planner.add_goal("Reduce operational costs", priority=2)
-            self.planner.add_goal("Boost sales growth", priority=1)
+            self.planner.add_goals([
+                ("Improve inventory management", 3),
+                ("Reduce operational costs", 2),
+                ("Boost sales growth", 1)
+            ])
+
+    @staticmethod
+    def _parse_goal_lines(lines):
+        """Yield (goal, priority) pairs from 'goal|priority' lines."""
+        for line in lines:
+            parts = line.strip().split("|")
+            if len(parts) == 2:
+                goal, priority = parts
+                try:
+                    priority = int(priority)
+                except ValueError:
+                    priority = 1
+                yield goal, priority
 
     def add_goal(self):
         goal_text = self.goal_entry.get().strip()
@@ -127,8 +134,7 @@ class ERPApp:
                 f"Similar goals were found:\n\n{similar_list}\n\nDo you still want to add '{goal_text}'?"
             )
             if proceed:
-                self.planner.goals.append({"goal": goal_text, "priority": priority})
-                self.planner.save_goals()
+                self.planner.add_goal(goal_text, priority, allow_similar=True)
                 messagebox.showinfo("Goal added", f"Goal '{goal_text}' added successfully.")
             else:
                 return  # user canceled
@@ -157,7 +163,7 @@ class ERPApp:
         self.output_text.delete(1.0, tk.END)
         self.output_text.insert(tk.END, "Current Goals:\n")
 
-        for g in sorted(self.planner.goals, key=lambda x: x["priority"], reverse=True):
+        for g in self.planner.top_goals():
             self.output_text.insert(tk.END, f"- {g['goal']} (Priority {g['priority']})\n")
 
         # Show priority summary from planner analysis
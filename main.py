@@ -3,7 +3,8 @@ from modules.inventory import InventoryModule
 from modules.sales import SalesModule
 from modules.hr import HRModule
 from modules.planner import PlannerModule
-from utils.helpers import log_event, calculate_metric
+from utils.helpers import calculate_metric
+from utils.logging import log_event
 
 def main():
     """
@@ -1,30 +1,440 @@
 """
 Long-term memory for storing historical data.
+Records are indexed by agent, by event type and by both, so filtered and
+time-range queries cost O(log n + k) for k matching records. Storage is
+pluggable: the default keeps records in a list, while memory.segment_log
+provides a durable on-disk backend. Optional retention limits evict the
+oldest raw records and fold them into compact per-bucket rollups.
 """
 
+import bisect
 import datetime
+import itertools
+import json
+import sys
+import threading
+from collections import Counter
+
+# (max age in seconds, bucket size in seconds) per rollup tier; the last tier keeps everything
+DEFAULT_ROLLUP_TIERS = ((86400, 60), (30 * 86400, 3600), (None, 86400))
+ERROR_MARKERS = ("error", "not found", "mismatch")
+_READ_CHUNK = 1024  # records resolved per lock acquisition when streaming
+
+
+class _Posting:
+    """Positions of the records sharing one index key, with their timestamps in append order."""
+
+    __slots__ = ("positions", "stamps")
+
+    def __init__(self):
+        self.positions = []
+        self.stamps = []
+
+    def append(self, position: int, stamp: str):
+        self.positions.append(position)
+        self.stamps.append(stamp)
+
+    def select(self, since: str = None, until: str = None, limit: int = None):
+        """Return positions within [since, until], keeping only the latest `limit`."""
+        lo = bisect.bisect_left(self.stamps, since) if since else 0
+        hi = bisect.bisect_right(self.stamps, until) if until else len(self.stamps)
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return self.positions[lo:hi]
+
+    def trim(self, position: int):
+        """Drop entries for positions before the given one."""
+        k = bisect.bisect_left(self.positions, position)
+        del self.positions[:k]
+        del self.stamps[:k]
+
+
+class ListBackend:
+    """Default in-process storage: records live in a Python list."""
 
-class MemoryBank:
     def __init__(self):
-        # persistent historical records
         self.records = []
+        self.first_position = 0
+
+    def append(self, record: dict) -> int:
+        self.records.append(record)
+        return self.first_position + len(self.records) - 1
+
+    def get(self, position: int) -> dict:
+        return self.records[position - self.first_position]
+
+    def get_many(self, positions):
+        base = self.first_position
+        return (self.records[p - base] for p in positions)
+
+    def scan(self, start: int = 0, stop: int = None):
+        base = self.first_position
+        start = max(start - base, 0)
+        stop = None if stop is None else max(stop - base, 0)
+        return itertools.islice(self.records, start, stop)
+
+    def truncate_before(self, position: int):
+        k = position - self.first_position
+        if k > 0:
+            del self.records[:k]
+            self.first_position = position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def load_state(self):
+        """Bank state saved alongside the records; nothing outlives an in-process list."""
+        return None
+
+    def save_state(self, state: dict):
+        pass
+
+    def __len__(self):
+        return len(self.records)
+
+
+class MemoryBank:
+    def __init__(self, backend=None, max_records: int = None, max_bytes: int = None,
+                 max_age: float = None, rollup_tiers=DEFAULT_ROLLUP_TIERS, retention_slack: float = 0.1):
+        """
+        :param backend: record storage (ListBackend by default, or a SegmentLog for durable history)
+        :param max_records: keep at most this many raw records
+        :param max_bytes: keep raw records under this many bytes (JSON-encoded size)
+        :param max_age: keep raw records younger than this many seconds
+        :param rollup_tiers: (max age, bucket seconds) pairs used to downsample evicted records
+        :param retention_slack: fraction of a limit freed per eviction pass, so eviction is amortized
+        """
+        # persistent historical records
+        self.backend = backend if backend is not None else ListBackend()
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.rollup_tiers = rollup_tiers
+        self.retention_slack = retention_slack
+        # Serializes writers, so positions reach the indexes in append order, and keeps
+        # readers from resolving positions while eviction shifts the backend underneath them
+        self._lock = threading.Lock()
+        # secondary indexes, maintained on add_record and rebuilt from the backend on startup
+        self._all = _Posting()
+        self._by_agent = {}
+        self._by_event = {}
+        self._by_agent_event = {}
+        # per-record encoded sizes, only tracked when max_bytes is set
+        self._sizes = []
+        self._bytes = 0
+        self.evicted = 0
+        # one {(agent, event, bucket_start): aggregate} dict per rollup tier
+        self._rollups = [{} for _ in rollup_tiers]
+        # Records before this position are already rolled up. Eviction drops whole segments
+        # only, so a durable backend may still hold some of them after a restart.
+        self._evicted_before = self.backend.first_position
+        self._load_state(self.backend.load_state())
+
+        start = max(self.backend.first_position, self._evicted_before)
+        for position, record in enumerate(self.backend.scan(start), start=start):
+            self._index(position, record["agent"], record["event"], record["timestamp"])
+            if self.max_bytes is not None:
+                self._track_size(record)
+        self._enforce_retention()
+
+    @property
+    def records(self):
+        return self.all()
 
     def add_record(self, agent_name: str, event: str, data: dict):
         timestamp = datetime.datetime.utcnow().isoformat()
-        self.records.append({
+        record = {
             "agent": agent_name,
             "event": event,
             "data": data,
             "timestamp": timestamp
-        })
-
-    def get_records(self, agent_name: str = None, event: str = None):
-        results = self.records
-        if agent_name:
-            results = [r for r in results if r["agent"] == agent_name]
-        if event:
-            results = [r for r in results if r["event"] == event]
-        return results
-
-    def all(self):
-        return list(self.records)
+        }
+        with self._lock:
+            position = self.backend.append(record)
+            self._index(position, agent_name, event, timestamp)
+            if self.max_bytes is not None:
+                self._track_size(record)
+            self._enforce_retention()
+
+    def _index(self, position: int, agent_name: str, event: str, timestamp: str):
+        # Index stamps never decrease, so a clock step backwards cannot break bisection
+        if self._all.stamps and timestamp < self._all.stamps[-1]:
+            timestamp = self._all.stamps[-1]
+        self._all.append(position, timestamp)
+        for index, key in ((self._by_agent, agent_name),
+                           (self._by_event, event),
+                           (self._by_agent_event, (agent_name, event))):
+            posting = index.get(key)
+            if posting is None:
+                posting = index[key] = _Posting()
+            posting.append(position, timestamp)
+
+    def _track_size(self, record: dict):
+        size = len(json.dumps(record, default=str))
+        self._sizes.append(size)
+        self._bytes += size
+
+    def _enforce_retention(self):
+        """Evict the oldest records once a limit is exceeded, freeing `retention_slack` of it at once."""
+        positions = self._all.positions
+        if not positions:
+            return
+        keep = 1 - self.retention_slack
+        cut = 0
+
+        if self.max_records is not None and len(positions) > self.max_records:
+            cut = len(positions) - int(self.max_records * keep)
+
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            excess = self._bytes - int(self.max_bytes * keep)
+            freed = k = 0
+            while freed < excess and k < len(self._sizes):
+                freed += self._sizes[k]
+                k += 1
+            cut = max(cut, k)
+
+        if self.max_age is not None:
+            now = datetime.datetime.utcnow()
+            overdue = now - datetime.timedelta(seconds=self.max_age * (2 - keep))
+            if self._all.stamps[0] < overdue.isoformat():
+                cutoff = now - datetime.timedelta(seconds=self.max_age)
+                cut = max(cut, bisect.bisect_left(self._all.stamps, cutoff.isoformat()))
+
+        if cut:
+            self._evict_before(positions[cut] if cut < len(positions) else positions[-1] + 1)
+
+    def _evict_before(self, position: int):
+        """Roll up and drop every raw record before position."""
+        for record in self.backend.scan(self._all.positions[0], position):
+            self._roll_up(record)
+        count = bisect.bisect_left(self._all.positions, position)
+        self._evicted_before = position
+        self.evicted += count
+        self._coarsen_rollups()
+        # Saved before any segment is deleted, so a crash in between cannot lose or repeat a rollup
+        self.backend.save_state(self._dump_state())
+        self.backend.truncate_before(position)
+        for index in (self._by_agent, self._by_event, self._by_agent_event):
+            for key in list(index):
+                index[key].trim(position)
+                if not index[key].positions:
+                    del index[key]
+        self._all.trim(position)
+        if self.max_bytes is not None:
+            self._bytes -= sum(self._sizes[:count])
+            del self._sizes[:count]
+
+    def _dump_state(self):
+        return {
+            "evicted_before": self._evicted_before,
+            "evicted": self.evicted,
+            "rollups": [[[agent, event, start, a["count"], a["errors"], a["actions"]]
+                         for (agent, event, start), a in buckets.items()]
+                        for buckets in self._rollups]
+        }
+
+    def _load_state(self, state):
+        if not state:
+            return
+        self._evicted_before = max(self._evicted_before, state["evicted_before"])
+        self.evicted = state["evicted"]
+        last = len(self._rollups) - 1
+        for tier, buckets in enumerate(state["rollups"]):
+            # Buckets of tiers dropped from rollup_tiers since they were saved go to the coarsest one
+            rollups = self._rollups[min(tier, last)]
+            for agent, event, start, count, errors, actions in buckets:
+                key = (agent, event, start)
+                aggregate = rollups.get(key)
+                if aggregate is None:
+                    rollups[key] = {"count": count, "errors": errors, "actions": Counter(actions)}
+                else:
+                    aggregate["count"] += count
+                    aggregate["errors"] += errors
+                    aggregate["actions"].update(actions)
+        self._coarsen_rollups()
+
+    def _roll_up(self, record: dict):
+        epoch = (datetime.datetime.fromisoformat(record["timestamp"])
+                 .replace(tzinfo=datetime.timezone.utc).timestamp())
+        age = datetime.datetime.now(datetime.timezone.utc).timestamp() - epoch
+        tier = next((i for i, (max_age, _) in enumerate(self.rollup_tiers)
+                     if max_age is None or age < max_age), len(self.rollup_tiers) - 1)
+        bucket_seconds = self.rollup_tiers[tier][1]
+        key = (record["agent"], record["event"], epoch - epoch % bucket_seconds)
+        aggregate = self._rollups[tier].get(key)
+        if aggregate is None:
+            aggregate = self._rollups[tier][key] = {"count": 0, "errors": 0, "actions": Counter()}
+        aggregate["count"] += 1
+        if self.is_error(record["data"]):
+            aggregate["errors"] += 1
+        aggregate["actions"].update(self.action_names(record["data"]))
+
+    @staticmethod
+    def is_error(data):
+        """Whether a record's data reports a failure; shared with AgentEvaluator."""
+        text = str(data).lower()
+        return any(marker in text for marker in ERROR_MARKERS)
+
+    @staticmethod
+    def action_names(data):
+        """Histogram keys: action names for decide/batch records, module names for act records."""
+        if not isinstance(data, dict):
+            return []
+        names = []
+        for entry in data.get("actions") or []:
+            # run_batch records nest one action list per event
+            group = entry if entry and isinstance(entry[0], (list, tuple)) else [entry]
+            names.extend(a[1] for a in group if isinstance(a, (list, tuple)) and len(a) == 3)
+        for entry in data.get("results") or []:
+            if isinstance(entry, (list, tuple)) and len(entry) == 2 and isinstance(entry[0], str):
+                names.append(entry[0])
+        return names
+
+    def _coarsen_rollups(self):
+        """Merge buckets that aged out of their tier into the next, coarser tier."""
+        now = datetime.datetime.now(datetime.timezone.utc).timestamp()
+        for tier, (max_age, _) in enumerate(self.rollup_tiers[:-1]):
+            bucket_seconds = self.rollup_tiers[tier + 1][1]
+            coarser = self._rollups[tier + 1]
+            for key in [k for k in self._rollups[tier] if now - k[2] >= max_age]:
+                aggregate = self._rollups[tier].pop(key)
+                agent, event, start = key
+                target_key = (agent, event, start - start % bucket_seconds)
+                target = coarser.get(target_key)
+                if target is None:
+                    coarser[target_key] = aggregate
+                else:
+                    target["count"] += aggregate["count"]
+                    target["errors"] += aggregate["errors"]
+                    target["actions"].update(aggregate["actions"])
+
+    def get_rollups(self, agent_name: str = None, event: str = None, since=None, until=None):
+        """
+        Return aggregates of evicted records, oldest bucket first.
+        Each entry holds agent, event, bucket_start (ISO), bucket_seconds, count, errors and actions.
+        """
+        since = self._stamp(since)
+        until = self._stamp(until)
+        with self._lock:
+            tiers = [list(buckets.items()) for buckets in self._rollups]
+        rows = []
+        for tier, buckets in enumerate(tiers):
+            bucket_seconds = self.rollup_tiers[tier][1]
+            for (agent, ev, start), aggregate in buckets:
+                if agent_name and agent != agent_name or event and ev != event:
+                    continue
+                stamp = datetime.datetime.utcfromtimestamp(start).isoformat()
+                if since and stamp < since or until and stamp > until:
+                    continue
+                rows.append({
+                    "agent": agent,
+                    "event": ev,
+                    "bucket_start": stamp,
+                    "bucket_seconds": bucket_seconds,
+                    "count": aggregate["count"],
+                    "errors": aggregate["errors"],
+                    "actions": dict(aggregate["actions"])
+                })
+        rows.sort(key=lambda r: r["bucket_start"])
+        return rows
+
+    def get_records(self, agent_name: str = None, event: str = None,
+                    since=None, until=None, limit: int = None, stream: bool = False):
+        """
+        Return retained records matching every given filter, oldest first.
+        :param agent_name: only records of this agent
+        :param event: only records of this event type
+        :param since: datetime or ISO string; only records at or after it
+        :param until: datetime or ISO string; only records at or before it
+        :param limit: keep only the latest `limit` matching records
+        :param stream: return a lazy generator instead of a list
+        """
+        since = self._stamp(since)
+        until = self._stamp(until)
+        with self._lock:
+            if agent_name and event:
+                posting = self._by_agent_event.get((agent_name, event))
+            elif agent_name:
+                posting = self._by_agent.get(agent_name)
+            elif event:
+                posting = self._by_event.get(event)
+            else:
+                posting = self._all
+            if posting is None:
+                return iter(()) if stream else []
+            positions = posting.select(since, until, limit)
+            if not stream:
+                return list(self.backend.get_many(positions))
+        return self._stream(positions)
+
+    def _stream(self, positions):
+        """
+        Lazily read records at positions, resolving a chunk at a time under the lock.
+        Positions evicted since they were selected are skipped.
+        """
+        for i in range(0, len(positions), _READ_CHUNK):
+            with self._lock:
+                chunk = [p for p in positions[i:i + _READ_CHUNK] if p >= self._evicted_before]
+                records = list(self.backend.get_many(chunk))
+            yield from records
+
+    def latest(self, n: int = 1, agent_name: str = None, event: str = None):
+        """Return the latest n records matching the filters, oldest first."""
+        return self.get_records(agent_name, event, limit=n)
+
+    @staticmethod
+    def _stamp(value):
+        if value is None or isinstance(value, str):
+            return value
+        return value.isoformat()
+
+    def all(self, stream: bool = False):
+        """Return every retained record, oldest first; with stream=True as a lazy generator."""
+        with self._lock:
+            if not stream:
+                start = self._all.positions[0] if self._all.positions else self._evicted_before
+                return list(self.backend.scan(start))
+            # Every retained position is indexed, so they form one contiguous range
+            positions = range(self._all.positions[0], self._all.positions[-1] + 1) if self._all.positions else ()
+        return self._stream(positions)
+
+    def memory_footprint(self):
+        """Report approximate bytes held by raw records, indexes and rollups."""
+        with self._lock:
+            return self._footprint()
+
+    def _footprint(self):
+        postings = [self._all] + [p for index in (self._by_agent, self._by_event, self._by_agent_event)
+                                  for p in index.values()]
+        index_bytes = sum(sys.getsizeof(p.positions) + sys.getsizeof(p.stamps) for p in postings)
+        index_bytes += sum(sys.getsizeof(s) for s in self._all.stamps)
+        if self.max_bytes is not None:
+            record_bytes = self._bytes
+        elif isinstance(self.backend, ListBackend):
+            record_bytes = sum(len(json.dumps(r, default=str)) for r in self.backend.records)
+        else:
+            # durable backends keep raw records on disk, not in RAM
+            record_bytes = 0
+        rollup_bytes = sum(sys.getsizeof(a) + sys.getsizeof(a["actions"])
+                           for buckets in self._rollups for a in buckets.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "records": len(self._all.positions),
+            "evicted_records": self.evicted,
+            "record_bytes": record_bytes,
+            "index_entries": sum(len(p.positions) for p in postings),
+            "index_bytes": index_bytes,
+            "rollup_buckets": sum(len(buckets) for buckets in self._rollups),
+            "rollup_bytes": rollup_bytes,
+            "total_bytes": record_bytes + index_bytes + rollup_bytes
+        }
+
+    def flush(self):
+        """Make all records durable (no-op for in-memory storage)."""
+        self.backend.flush()
+
+    def close(self):
+        self.backend.close()
@@ -0,0 +1,273 @@
+"""
+Durable append-only segment log, usable as a MemoryBank backend.
+Records are written as JSON lines to segment files named after the position of
+their first record. Each segment has a sparse side index of (position, offset)
+pairs, and reads go through memory maps, so history can be streamed lazily
+instead of being held in RAM.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+_INDEX_ENTRY = struct.Struct("<QQ")
+
+
+class _Segment:
+    """One segment file, its sparse offset index and a cached read-only map."""
+
+    __slots__ = ("base", "path", "index_path", "count", "size",
+                 "index_positions", "index_offsets", "map", "mapped_size")
+
+    def __init__(self, directory: str, base: int):
+        self.base = base
+        name = f"{base:020d}"
+        self.path = os.path.join(directory, name + ".log")
+        self.index_path = os.path.join(directory, name + ".idx")
+        self.count = 0
+        self.size = 0
+        self.index_positions = []
+        self.index_offsets = []
+        self.map = None
+        self.mapped_size = 0
+
+    def view(self, size: int):
+        """
+        Return a memory map covering at least size bytes, remapped when the file has grown.
+        :param size: flushed length of the segment, as returned by SegmentLog._snapshot
+        """
+        view = self.map
+        if self.mapped_size < size:
+            # Older maps are left to the garbage collector: a concurrent reader may still hold one
+            with open(self.path, "rb") as f:
+                view = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self.map = view
+            self.mapped_size = size
+        return view
+
+    def offset_of(self, position: int, view) -> int:
+        """Byte offset of a record, seeking from the nearest sparse index entry."""
+        i = bisect.bisect_right(self.index_positions, position) - 1
+        offset = self.index_offsets[i]
+        for _ in range(position - self.index_positions[i]):
+            offset = view.find(b"\n", offset) + 1
+        return offset
+
+    def load(self):
+        """Recover count, size and index from disk, dropping a torn trailing write."""
+        self.size = os.path.getsize(self.path)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+            usable = len(raw) - len(raw) % _INDEX_ENTRY.size
+            for position, offset in _INDEX_ENTRY.iter_unpack(raw[:usable]):
+                if offset < self.size:
+                    self.index_positions.append(position)
+                    self.index_offsets.append(offset)
+        if not self.index_positions:
+            self.index_positions, self.index_offsets = [self.base], [0]
+
+        position, offset = self.index_positions[-1], self.index_offsets[-1]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        end = tail.rfind(b"\n") + 1
+        if end < len(tail):
+            with open(self.path, "r+b") as f:
+                f.truncate(offset + end)
+            self.size = offset + end
+        self.count = position - self.base + tail.count(b"\n", 0, end)
+        with open(self.index_path, "wb") as f:
+            for entry in zip(self.index_positions, self.index_offsets):
+                f.write(_INDEX_ENTRY.pack(*entry))
+
+
+class SegmentLog:
+    STATE_FILE = "state.json"
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 fsync_every: int = 256, fsync_interval: float = 1.0, index_interval: int = 64):
+        """
+        :param directory: folder holding the segment and index files
+        :param segment_max_bytes: size after which a new segment is started
+        :param fsync_every: number of appends between fsyncs
+        :param fsync_interval: maximum seconds between fsyncs while appending
+        :param index_interval: one sparse index entry is kept every this many records
+        """
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.index_interval = index_interval
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        bases = sorted(int(name[:-4]) for name in os.listdir(directory) if name.endswith(".log"))
+        self.segments = []
+        for base in bases:
+            segment = _Segment(directory, base)
+            segment.load()
+            self.segments.append(segment)
+        if not self.segments:
+            self.segments.append(_Segment(directory, 0))
+        self.bases = [s.base for s in self.segments]
+        self.next_position = self.segments[-1].base + self.segments[-1].count
+        self._open_active()
+
+    def _open_active(self):
+        active = self.segments[-1]
+        self._file = open(active.path, "ab")
+        self._index_file = open(active.index_path, "ab")
+        self._pending = 0
+        self._unflushed = False
+        self._last_sync = time.monotonic()
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._index_file.close()
+        segment = _Segment(self.directory, self.next_position)
+        self.segments.append(segment)
+        self.bases.append(segment.base)
+        self._open_active()
+        return segment
+
+    def _sync(self):
+        self._file.flush()
+        self._index_file.flush()
+        os.fsync(self._file.fileno())
+        os.fsync(self._index_file.fileno())
+        self._pending = 0
+        self._unflushed = False
+        self._last_sync = time.monotonic()
+
+    def append(self, record: dict) -> int:
+        """Append a record and return its position. Durability is batched by fsync_every/interval."""
+        line = json.dumps(record, default=str).encode("utf-8") + b"\n"
+        with self.lock:
+            segment = self.segments[-1]
+            if segment.count and segment.size + len(line) > self.segment_max_bytes:
+                segment = self._rotate()
+            position = self.next_position
+            if (position - segment.base) % self.index_interval == 0:
+                segment.index_positions.append(position)
+                segment.index_offsets.append(segment.size)
+                self._index_file.write(_INDEX_ENTRY.pack(position, segment.size))
+            self._file.write(line)
+            segment.size += len(line)
+            segment.count += 1
+            self.next_position += 1
+            self._pending += 1
+            self._unflushed = True
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            return position
+
+    def flush(self):
+        """Force pending appends to disk."""
+        with self.lock:
+            self._sync()
+
+    def close(self):
+        with self.lock:
+            self._sync()
+            self._file.close()
+            self._index_file.close()
+
+    def load_state(self):
+        """Return the dict last passed to save_state, or None."""
+        try:
+            with open(os.path.join(self.directory, self.STATE_FILE), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def save_state(self, state: dict):
+        """Durably replace the caller's state (e.g. MemoryBank rollups) kept next to the segments."""
+        path = os.path.join(self.directory, self.STATE_FILE)
+        with open(path + ".tmp", "wb") as f:
+            f.write(json.dumps(state, default=str).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def __len__(self):
+        return self.next_position - self.segments[0].base
+
+    @property
+    def first_position(self) -> int:
+        return self.segments[0].base
+
+    def truncate_before(self, position: int):
+        """Delete whole segments whose records all precede position; the active segment is kept."""
+        with self.lock:
+            while len(self.segments) > 1 and self.segments[1].base <= position:
+                segment = self.segments.pop(0)
+                self.bases.pop(0)
+                os.remove(segment.path)
+                if os.path.exists(segment.index_path):
+                    os.remove(segment.index_path)
+
+    def _snapshot(self):
+        """
+        Make buffered appends visible to readers. Returns the end position and each segment's
+        flushed size by base, so readers never map bytes the appender is still writing.
+        """
+        with self.lock:
+            if self._unflushed:
+                self._file.flush()
+                self._unflushed = False
+            return self.next_position, {segment.base: segment.size for segment in self.segments}
+
+    def _segment_for(self, position: int) -> _Segment:
+        return self.segments[bisect.bisect_right(self.bases, position) - 1]
+
+    def get(self, position: int) -> dict:
+        """Read a single record by position."""
+        end, sizes = self._snapshot()
+        if not self.segments[0].base <= position < end:
+            raise IndexError(f"Position {position} not in log")
+        segment = self._segment_for(position)
+        view = segment.view(sizes[segment.base])
+        offset = segment.offset_of(position, view)
+        return json.loads(view[offset:view.find(b"\n", offset)])
+
+    def get_many(self, positions):
+        """Lazily read records at ascending positions, seeking forward from the previous read."""
+        _, sizes = self._snapshot()
+        segment = view = None
+        cursor = offset = None
+        for position in positions:
+            if segment is None or not segment.base <= position < segment.base + segment.count:
+                segment = self._segment_for(position)
+                view = segment.view(sizes[segment.base])
+                cursor = None
+            if cursor is not None and cursor <= position and position - cursor < self.index_interval:
+                for _ in range(position - cursor):
+                    offset = view.find(b"\n", offset) + 1
+            else:
+                offset = segment.offset_of(position, view)
+            end = view.find(b"\n", offset)
+            yield json.loads(view[offset:end])
+            cursor, offset = position + 1, end + 1
+
+    def scan(self, start: int = 0, stop: int = None):
+        """Lazily stream records in [start, stop) in append order."""
+        end, sizes = self._snapshot()
+        stop = end if stop is None else min(stop, end)
+        start = max(start, self.segments[0].base)
+        position = start
+        while position < stop:
+            segment = self._segment_for(position)
+            view = segment.view(sizes[segment.base])
+            offset = segment.offset_of(position, view)
+            last = min(stop, segment.base + segment.count)
+            while position < last:
+                end_of_line = view.find(b"\n", offset)
+                yield json.loads(view[offset:end_of_line])
+                offset = end_of_line + 1
+                position += 1
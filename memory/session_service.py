@@ -1,20 +1,198 @@
 """
 InMemory session management for temporary state.
+SessionService holds one session's state; SessionStore keeps many sessions
+keyed by session/tenant id, with sliding TTLs, LRU eviction under a memory
+budget, lazy expiry and an optional background sweeper.
 """
 
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _estimate_size(value, depth: int = 4) -> int:
+    """Approximate deep size in bytes of a session value."""
+    size = sys.getsizeof(value)
+    if depth:
+        if isinstance(value, dict):
+            size += sum(_estimate_size(k, depth - 1) + _estimate_size(v, depth - 1) for k, v in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(_estimate_size(v, depth - 1) for v in value)
+    return size
+
+
 class SessionService:
-    def __init__(self):
+    def __init__(self, store=None, session_id: str = None, ttl: float = None):
+        """
+        :param store: owning SessionStore, if any (sizes are reported to it)
+        :param session_id: key of this session in the store
+        :param ttl: seconds of inactivity after which the store expires the session
+        """
         # ephemeral state, cleared when agent restarts
         self.state = {}
+        self.lock = threading.RLock()
+        self.store = store
+        self.session_id = session_id
+        self.ttl = ttl
+        self.last_access = time.monotonic()
+        self.nbytes = 0
+        self._sizes = {}
 
     def set(self, key: str, value):
-        self.state[key] = value
+        size = _estimate_size(value) if self.store is not None else 0
+        with self.lock:
+            self.state[key] = value
+            delta = size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+        self.last_access = time.monotonic()
+        if self.store is not None and delta:
+            self.store._resized(self, delta)
 
     def get(self, key: str, default=None):
-        return self.state.get(key, default)
+        self.last_access = time.monotonic()
+        with self.lock:
+            return self.state.get(key, default)
 
     def clear(self):
-        self.state.clear()
+        with self.lock:
+            self.state.clear()
+            self._sizes.clear()
+            delta = -self.nbytes
+        if self.store is not None and delta:
+            self.store._resized(self, delta)
 
     def all(self):
-        return dict(self.state)
+        with self.lock:
+            return dict(self.state)
+
+    def expired(self, now: float = None) -> bool:
+        if self.ttl is None:
+            return False
+        return (now or time.monotonic()) - self.last_access > self.ttl
+
+
+class SessionStore:
+    def __init__(self, default_ttl: float = 1800.0, max_bytes: int = 64 * 1024 * 1024,
+                 max_sessions: int = None, sweep_interval: float = 60.0):
+        """
+        :param default_ttl: seconds of inactivity before a session expires (None = never)
+        :param max_bytes: memory budget for all session state; least recently used sessions are evicted
+        :param max_sessions: optional cap on the number of live sessions
+        :param sweep_interval: seconds between background sweeps, once start_sweeper() is called
+        """
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        # session_id -> SessionService, least recently used first.
+        # The store lock only guards this map; each session's state has its own lock.
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.stats = {"created": 0, "expired": 0, "evicted": 0}
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def session(self, session_id: str, ttl: float = None) -> SessionService:
+        """Return the live session for session_id, creating it if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session.expired(now):
+                self._discard(session_id, "expired")
+                session = None
+            if session is None:
+                session = SessionService(self, session_id, self.default_ttl if ttl is None else ttl)
+                self._sessions[session_id] = session
+                self.stats["created"] += 1
+                if self.max_sessions is not None and len(self._sessions) > self.max_sessions:
+                    self._evict(keep=session_id)
+            else:
+                self._sessions.move_to_end(session_id)
+                if ttl is not None:
+                    session.ttl = ttl
+            session.last_access = now
+            return session
+
+    def get(self, session_id: str, key: str, default=None):
+        return self.session(session_id).get(key, default)
+
+    def set(self, session_id: str, key: str, value):
+        self.session(session_id).set(key, value)
+
+    def drop(self, session_id: str):
+        """Remove a session and its state."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._discard(session_id, None)
+
+    def __contains__(self, session_id: str):
+        session = self._sessions.get(session_id)
+        return session is not None and not session.expired()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _discard(self, session_id: str, reason: str):
+        session = self._sessions.pop(session_id)
+        self.nbytes -= session.nbytes
+        if reason:
+            self.stats[reason] += 1
+
+    def _resized(self, session: SessionService, delta: int):
+        # Session sizes only change under the store lock, so the store total stays exact
+        with self._lock:
+            session.nbytes += delta
+            if self._sessions.get(session.session_id) is not session:
+                return  # already evicted or expired
+            self.nbytes += delta
+            if self.max_bytes is not None and self.nbytes > self.max_bytes:
+                self._evict(keep=session.session_id)
+
+    def _evict(self, keep: str):
+        """Evict least recently used sessions until within budget; never the one being written."""
+        while self._sessions and (
+                (self.max_bytes is not None and self.nbytes > self.max_bytes)
+                or (self.max_sessions is not None and len(self._sessions) > self.max_sessions)):
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(keep)
+                continue
+            self._discard(session_id, "evicted")
+
+    def sweep(self) -> int:
+        """Expire every idle session now; returns how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            candidates = list(self._sessions.items())
+        expired = [sid for sid, session in candidates if session.expired(now)]
+        with self._lock:
+            for session_id in expired:
+                session = self._sessions.get(session_id)
+                if session is not None and session.expired(now):
+                    self._discard(session_id, "expired")
+        return len(expired)
+
+    def start_sweeper(self):
+        """Start a daemon thread that calls sweep() every sweep_interval seconds."""
+        if self._sweeper is None or not self._sweeper.is_alive():
+            self._stop.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def footprint(self):
+        """Return session count, estimated bytes and lifetime counters."""
+        return {"sessions": len(self._sessions), "bytes": self.nbytes, **self.stats}
@@ -0,0 +1,98 @@
+"""
+Vectorized demand forecasting for InventoryModule.
+Per-SKU demand is accumulated into fixed-length periods and smoothed with
+exponential smoothing across all SKUs in a single NumPy pass at each period
+boundary. SKU ids are the inventory ledger's dense ids.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class DemandForecaster:
+    def __init__(self, alpha=0.3, period_seconds=86400, default_forecast=100.0,
+                 min_period_fraction=0.25, initial_capacity=1024, clock=time.time):
+        """
+        :param alpha: smoothing factor; higher reacts faster to recent demand
+        :param period_seconds: length of one demand period (forecasts are per period)
+        :param default_forecast: forecast for SKUs with no sales history yet
+        :param min_period_fraction: share of the open period that must elapse before it is projected
+        :param initial_capacity: initial number of SKU slots
+        :param clock: time source, in seconds
+        """
+        self.alpha = alpha
+        self.period_seconds = period_seconds
+        self.default_forecast = default_forecast
+        self.min_period_fraction = min_period_fraction
+        self.clock = clock
+        self.level = np.zeros(initial_capacity, dtype=np.float64)  # smoothed demand per period
+        self.current = np.zeros(initial_capacity, dtype=np.int64)  # demand in the open period
+        self.seen = np.zeros(initial_capacity, dtype=bool)  # SKU has closed at least one period with sales
+        self.period_start = self.clock()
+        self.lock = threading.Lock()
+
+    def _ensure_capacity(self, needed):
+        if needed <= len(self.level):
+            return
+        capacity = max(needed, 2 * len(self.level))
+        for name in ("level", "current", "seen"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _roll(self):
+        """Close every period that has ended, smoothing all SKUs at once."""
+        elapsed = int((self.clock() - self.period_start) // self.period_seconds)
+        if elapsed <= 0:
+            return
+        observed = self.seen | (self.current > 0)
+        smoothed = self.alpha * self.current + (1 - self.alpha) * self.level
+        # A SKU's first period with sales initializes its level directly
+        self.level = np.where(self.seen, smoothed, np.where(observed, self.current, 0.0))
+        self.seen = observed
+        if elapsed > 1:
+            # Periods with no orders at all count as zero demand
+            self.level *= (1 - self.alpha) ** (elapsed - 1)
+        self.current[:] = 0
+        self.period_start += elapsed * self.period_seconds
+
+    def record(self, sku_ids, quantities):
+        """Add sold quantities for SKU ids to the open period; O(len(sku_ids))."""
+        sku_ids = np.asarray(sku_ids, dtype=np.int64)
+        if not len(sku_ids):
+            return
+        with self.lock:
+            self._ensure_capacity(int(sku_ids.max()) + 1)
+            self._roll()
+            np.add.at(self.current, sku_ids, np.asarray(quantities, dtype=np.int64))
+
+    def forecast(self, sku_ids, horizon=1):
+        """
+        Forecast demand over the next `horizon` periods for the given SKU ids.
+        The open period is projected from its elapsed share once min_period_fraction has passed.
+        """
+        level, seen = self._estimate(sku_ids)
+        return np.where(seen, level, self.default_forecast) * horizon
+
+    def has_history(self, sku_ids):
+        """Bool mask of the SKU ids forecast from their own sales rather than default_forecast."""
+        return self._estimate(sku_ids)[1]
+
+    def _estimate(self, sku_ids):
+        """Per-period demand level and history mask for SKU ids."""
+        sku_ids = np.asarray(sku_ids, dtype=np.int64)
+        with self.lock:
+            self._ensure_capacity(int(sku_ids.max()) + 1 if len(sku_ids) else 0)
+            self._roll()
+            level = self.level[sku_ids]
+            current = self.current[sku_ids]
+            seen = self.seen[sku_ids]
+        fraction = (self.clock() - self.period_start) / self.period_seconds
+        if fraction >= self.min_period_fraction:
+            projected = current / fraction
+            level = np.where(seen, self.alpha * projected + (1 - self.alpha) * level, projected)
+            seen = seen | (current > 0)
+        return level, seen
@@ -0,0 +1,168 @@
+"""
+Indexes for PlannerModule goals.
+Both similarity indexes return exact Jaccard scores over lower-cased whitespace
+tokens, so results follow the planner's similarity_threshold whatever its
+current value. PriorityIndex keeps goals ordered by priority.
+"""
+
+import bisect
+import math
+import random
+from collections import defaultdict
+
+
+def tokenize(goal: str) -> frozenset:
+    return frozenset(goal.lower().split())
+
+
+def jaccard(tokens1: frozenset, tokens2: frozenset) -> float:
+    if not tokens1 or not tokens2:
+        return 0.0
+    overlap = len(tokens1 & tokens2)
+    return overlap / (len(tokens1) + len(tokens2) - overlap)
+
+
+class TokenIndex:
+    """Inverted token index; candidates are pruned by token-set size before scoring."""
+
+    def __init__(self):
+        self.postings = defaultdict(set)  # token -> goal keys
+        self.tokens = {}  # goal key -> token set
+
+    def add(self, key: str, tokens: frozenset):
+        self.tokens[key] = tokens
+        for token in tokens:
+            self.postings[token].add(key)
+
+    def remove(self, key: str):
+        for token in self.tokens.pop(key, ()):
+            keys = self.postings[token]
+            keys.discard(key)
+            if not keys:
+                del self.postings[token]
+
+    def query(self, tokens: frozenset, threshold: float):
+        """Return (key, score) for every indexed goal with Jaccard score >= threshold."""
+        if threshold <= 0:
+            return [(key, jaccard(tokens, other)) for key, other in self.tokens.items()]
+        if not tokens:
+            return []
+        # |A & B| / |A | B| >= t requires t*|A| <= |B| <= |A|/t
+        size = len(tokens)
+        min_size = math.ceil(threshold * size - 1e-9)
+        max_size = math.floor(size / threshold + 1e-9)
+        overlaps = defaultdict(int)
+        for token in tokens:
+            for key in self.postings.get(token, ()):
+                if min_size <= len(self.tokens[key]) <= max_size:
+                    overlaps[key] += 1
+        hits = []
+        for key, overlap in overlaps.items():
+            score = overlap / (size + len(self.tokens[key]) - overlap)
+            if score >= threshold:
+                hits.append((key, score))
+        return hits
+
+
+class MinHashIndex:
+    """
+    MinHash signatures with LSH banding for very large goal sets.
+    Candidates are verified with the exact Jaccard score, so there are no false
+    positives; a pair far below the LSH threshold may occasionally be missed.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.perms = [(rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME)) for _ in range(num_perm)]
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+        self.tokens = {}
+        self.band_keys = {}
+
+    def _bands(self, tokens: frozenset):
+        hashes = [hash(t) & self._PRIME for t in tokens]
+        signature = [min((a * h + b) % self._PRIME for h in hashes) for a, b in self.perms]
+        return [hash(tuple(signature[i * self.rows:(i + 1) * self.rows])) for i in range(self.bands)]
+
+    def add(self, key: str, tokens: frozenset):
+        self.tokens[key] = tokens
+        if tokens:
+            self.band_keys[key] = self._bands(tokens)
+            for bucket, band in zip(self.buckets, self.band_keys[key]):
+                bucket[band].add(key)
+
+    def remove(self, key: str):
+        self.tokens.pop(key, None)
+        for bucket, band in zip(self.buckets, self.band_keys.pop(key, ())):
+            keys = bucket[band]
+            keys.discard(key)
+            if not keys:
+                del bucket[band]
+
+    def query(self, tokens: frozenset, threshold: float):
+        """Return (key, score) for LSH candidates with Jaccard score >= threshold."""
+        if threshold <= 0:
+            return [(key, jaccard(tokens, other)) for key, other in self.tokens.items()]
+        if not tokens:
+            return []
+        candidates = set()
+        for bucket, band in zip(self.buckets, self._bands(tokens)):
+            candidates.update(bucket.get(band, ()))
+        hits = []
+        for key in candidates:
+            score = jaccard(tokens, self.tokens[key])
+            if score >= threshold:
+                hits.append((key, score))
+        return hits
+
+
+class PriorityIndex:
+    """
+    Goals bucketed by priority, kept ordered on every add, remove and priority change.
+    Within a priority, goals keep insertion order (the order a stable sort would give).
+    """
+
+    def __init__(self):
+        self.priorities = []  # distinct priorities, ascending
+        self.buckets = {}  # priority -> ascending insertion sequence numbers
+        self.keys = {}  # sequence number -> goal key
+
+    def add(self, key: str, seq: int, priority):
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = []
+            bisect.insort(self.priorities, priority)
+        bisect.insort(bucket, seq)
+        self.keys[seq] = key
+
+    def remove(self, seq: int, priority):
+        bucket = self.buckets[priority]
+        del bucket[bisect.bisect_left(bucket, seq)]
+        del self.keys[seq]
+        if not bucket:
+            del self.buckets[priority]
+            del self.priorities[bisect.bisect_left(self.priorities, priority)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def top(self):
+        """Key of the first goal with the highest priority, or None."""
+        if not self.priorities:
+            return None
+        return self.keys[self.buckets[self.priorities[-1]][0]]
+
+    def ordered(self):
+        """Yield goal keys by descending priority; O(1) per key, so the first k cost O(k)."""
+        for priority in reversed(self.priorities):
+            for seq in self.buckets[priority]:
+                yield self.keys[seq]
+
+    def counts(self):
+        """{priority: number of goals}, highest priority first."""
+        return {p: len(self.buckets[p]) for p in reversed(self.priorities)}
@@ -0,0 +1,85 @@
+"""
+Journaled persistence for PlannerModule goals.
+Changes are appended to a JSON-lines journal next to the snapshot file and
+periodically compacted into a new snapshot written via atomic rename.
+"""
+
+import json
+import os
+
+
+class GoalJournal:
+    def __init__(self, snapshot_path: str, compact_every: int = 1000):
+        """
+        :param snapshot_path: JSON snapshot of all goals (the planner's save_file)
+        :param compact_every: journal entries after which the planner compacts into a new snapshot
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + ".journal"
+        self.compact_every = compact_every
+        self.entries = 0
+
+    def load(self):
+        """Return goals from the snapshot with the journal replayed; nothing is rewritten."""
+        goals = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r") as f:
+                for g in json.load(f):
+                    key = g["goal"].lower()
+                    if key not in goals or g["priority"] > goals[key]["priority"]:
+                        goals[key] = g
+
+        self.entries = 0
+        if os.path.exists(self.journal_path):
+            valid = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        break
+                    self._replay(goals, op)
+                    self.entries += 1
+                    valid += len(line)
+            if valid < os.path.getsize(self.journal_path):
+                # Drop a torn final write so later appends start on a clean line
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(valid)
+        return list(goals.values())
+
+    @staticmethod
+    def _replay(goals: dict, op: dict):
+        key = op["goal"].lower()
+        if op["op"] == "remove":
+            goals.pop(key, None)
+        elif key in goals:
+            goals[key]["priority"] = op["priority"]
+        elif op["op"] == "add":
+            goals[key] = {"goal": op["goal"], "priority": op["priority"]}
+
+    def append(self, ops: list):
+        """Durably append journal entries with a single write and fsync."""
+        if not ops:
+            return
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(op) + "\n" for op in ops))
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries += len(ops)
+
+    def needs_compaction(self) -> bool:
+        return self.entries >= self.compact_every
+
+    def compact(self, goals: list):
+        """Write a full snapshot atomically, then reset the journal."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(goals, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # Replaying the old journal over the new snapshot is harmless, so a crash here loses nothing
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "w") as f:
+                os.fsync(f.fileno())
+        self.entries = 0
@@ -1,36 +1,235 @@
+import csv
+import json
+import os
+import sys
+import threading
+
+from utils.kpi import EMPLOYEE_ADDED, EMPLOYEE_REMOVED, EMPLOYEE_UPDATED
+
+
+class Employee:
+    """Compact employee record; fields beyond name and role are kept in `extra`."""
+    __slots__ = ("employee_id", "name", "role", "extra")
+
+    def __init__(self, employee_id, name, role, extra=None):
+        self.employee_id = employee_id
+        self.name = name
+        self.role = sys.intern(role) if isinstance(role, str) else role
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, employee_id, data):
+        extra = {k: v for k, v in data.items() if k not in ("employee_id", "name", "role")}
+        return cls(employee_id, data.get("name"), data.get("role"), extra)
+
+    def to_dict(self):
+        data = {"name": self.name, "role": self.role}
+        if self.extra:
+            data.update(self.extra)
+        data["employee_id"] = self.employee_id
+        return data
+
+
 class HRModule:
-    def __init__(self):
-        self.employees = {}
+    def __init__(self, kpi=None):
+        """
+        :param kpi: optional KPIEngine notified of headcount changes
+        """
+        self.employees = {}  # employee_id -> Employee
         self.next_id = 1
+        self._by_role = {}  # role -> set of employee ids
+        self._by_name = {}  # lower-cased name -> set of employee ids
+        self._lock = threading.Lock()
+        self.kpi = kpi
+
+    @staticmethod
+    def _name_key(name):
+        return name.lower() if isinstance(name, str) else name
+
+    def _index(self, employee):
+        self._by_role.setdefault(employee.role, set()).add(employee.employee_id)
+        self._by_name.setdefault(self._name_key(employee.name), set()).add(employee.employee_id)
+
+    def _unindex(self, employee):
+        for index, key in ((self._by_role, employee.role),
+                           (self._by_name, self._name_key(employee.name))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(employee.employee_id)
+                if not ids:
+                    del index[key]
+
+    def _insert(self, data):
+        with self._lock:
+            employee = Employee.from_dict(self.next_id, data)
+            self.next_id += 1
+            self.employees[employee.employee_id] = employee
+            self._index(employee)
+        if self.kpi is not None:
+            self.kpi.publish(EMPLOYEE_ADDED, employee_id=employee.employee_id, role=employee.role)
+        return employee
 
     def add_employee(self, employee):
         """
         Add a new employee.
         :param employee: dict with employee details (e.g. {"name": ..., "role": ...})
         """
-        emp_id = self.next_id
-        employee["employee_id"] = emp_id
-        self.employees[emp_id] = employee
-        self.next_id += 1
+        record = self._insert(employee)
+        return {
+            "status": "success",
+            "employee_id": record.employee_id,
+            "data": record.to_dict()
+        }
+
+    def add_employee_batch(self, params_list):
+        """
+        Bulk entry point for add_employee used by ERPAgent.act_batch.
+        :param params_list: list of add_employee keyword dicts
+        """
+        return [self.add_employee(params["employee"]) for params in params_list]
+
+    @staticmethod
+    def _read_rows(path, format):
+        """
+        Yield (line number, row dict or parse error) without loading the whole file.
+        Lines are decoded one at a time, so a line that is not UTF-8 or not valid CSV
+        is reported as that row's error and the rows after it are still read.
+        """
+        with open(path, "rb") as f:
+            if format == "csv":
+                bad_lines = []  # (line number, error) for lines that failed to decode
+                read = [0]  # lines handed to the reader; its line_num lags behind when it raises
+
+                def decoded(lines):
+                    for line_num, line in enumerate(lines, start=1):
+                        read[0] = line_num
+                        try:
+                            yield line.decode("utf-8")
+                        except UnicodeDecodeError as e:
+                            bad_lines.append((line_num, e))
+                            yield "\n"  # keeps reader.line_num in step; DictReader skips blank rows
+
+                reader = csv.DictReader(decoded(f))
+                try:
+                    reader.fieldnames
+                except csv.Error as e:
+                    yield read[0], e
+                    return
+                while True:
+                    try:
+                        row = next(reader)
+                    except StopIteration:
+                        row = None
+                    except csv.Error as e:
+                        row = e
+                    yield from bad_lines
+                    bad_lines.clear()
+                    if row is None:
+                        return
+                    if isinstance(row, csv.Error):
+                        yield read[0], row
+                    else:
+                        # Drop empty cells so optional columns don't become empty-string fields
+                        yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, "")}
+            else:
+                for line_num, line in enumerate(f, start=1):
+                    try:
+                        line = line.decode("utf-8")
+                    except UnicodeDecodeError as e:
+                        yield line_num, e
+                        continue
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        yield line_num, e
+                        continue
+                    yield line_num, row if isinstance(row, dict) else ValueError("row is not an object")
+
+    def import_employees(self, path, format=None, max_errors=100):
+        """
+        Stream employees from a CSV or JSON-lines file.
+        Rows are validated and inserted one at a time, so memory stays bounded by
+        the records kept rather than the file. A bad row is reported and skipped
+        without aborting the rest of the import.
+        :param path: file to read
+        :param format: "csv" or "jsonl"; inferred from the file extension if omitted
+        :param max_errors: number of row errors included in the result (all are counted)
+        """
+        if format is None:
+            format = "csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl"
+        if format not in ("csv", "jsonl"):
+            return {"status": "error", "message": f"Unsupported format {format}"}
+        if not os.path.exists(path):
+            return {"status": "error", "message": f"File {path} not found"}
+
+        imported = failed = 0
+        first_id = None
+        errors = []
+        for line_num, row in self._read_rows(path, format):
+            if isinstance(row, Exception):
+                error = f"invalid row: {row}"
+            elif not row.get("name"):
+                error = "missing name"
+            elif not row.get("role"):
+                error = "missing role"
+            else:
+                record = self._insert(row)
+                if first_id is None:
+                    first_id = record.employee_id
+                imported += 1
+                continue
+            failed += 1
+            if len(errors) < max_errors:
+                errors.append({"line": line_num, "error": error})
         return {
             "status": "success",
-            "employee_id": emp_id,
-            "data": employee
+            "imported": imported,
+            "failed": failed,
+            "first_id": first_id,
+            "errors": errors
         }
 
+    def find_by_role(self, role):
+        """
+        Return employee dicts with the given role, by employee id.
+        """
+        return [self.employees[i].to_dict() for i in sorted(self._by_role.get(role, ()))]
+
+    def find_by_name(self, name):
+        """
+        Return employee dicts whose name matches, ignoring case, by employee id.
+        """
+        return [self.employees[i].to_dict() for i in sorted(self._by_name.get(self._name_key(name), ()))]
+
+    def headcount(self, role=None):
+        """
+        Number of employees, overall or for one role.
+        """
+        return len(self.employees) if role is None else len(self._by_role.get(role, ()))
+
     def update_employee(self, employee_id, info):
         """
         Update an existing employee's information.
         :param employee_id: int
         :param info: dict of fields to update
         """
-        if employee_id not in self.employees:
-            return {"status": "error", "message": f"Employee {employee_id} not found"}
-        self.employees[employee_id].update(info)
+        with self._lock:
+            employee = self.employees.get(employee_id)
+            if employee is None:
+                return {"status": "error", "message": f"Employee {employee_id} not found"}
+            self._unindex(employee)
+            updated = Employee.from_dict(employee_id, {**employee.to_dict(), **info})
+            self.employees[employee_id] = updated
+            self._index(updated)
+        if self.kpi is not None:
+            self.kpi.publish(EMPLOYEE_UPDATED, employee_id=employee_id,
+                             old_role=employee.role, new_role=updated.role)
         return {
             "status": "success",
             "employee_id": employee_id,
-            "updated": self.employees[employee_id]
+            "updated": updated.to_dict()
         }
 
     def remove_employee(self, employee_id):
@@ -38,11 +237,15 @@ class HRModule:
         Remove an employee by ID.
         :param employee_id: int
         """
-        if employee_id not in self.employees:
-            return {"status": "error", "message": f"Employee {employee_id} not found"}
-        removed = self.employees.pop(employee_id)
+        with self._lock:
+            removed = self.employees.pop(employee_id, None)
+            if removed is None:
+                return {"status": "error", "message": f"Employee {employee_id} not found"}
+            self._unindex(removed)
+        if self.kpi is not None:
+            self.kpi.publish(EMPLOYEE_REMOVED, employee_id=employee_id, role=removed.role)
         return {
             "status": "success",
             "employee_id": employee_id,
-            "removed": removed
+            "removed": removed.to_dict()
         }
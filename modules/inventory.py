@@ -1,30 +1,226 @@
+import numbers
+import threading
+from contextlib import ExitStack
+
+import numpy as np
+
+from modules.forecast import DemandForecaster
+from utils.kpi import STOCK_CHANGED
+
+
 class InventoryModule:
-    def __init__(self):
-        self.inventory = {}
+    """
+    Inventory ledger backed by NumPy arrays.
+    SKU strings are interned to dense integer ids indexing a stock array, so bulk
+    operations over many SKUs run as single vectorized passes.
+    Stock changes are guarded by striped per-SKU locks: single-SKU updates and
+    order reservations only lock the stripes they touch, while bulk operations
+    and array growth take every stripe.
+    """
+
+    def __init__(self, initial_capacity=1024, forecaster=None, lock_stripes=64, kpi=None):
+        """
+        :param initial_capacity: initial number of SKU slots
+        :param forecaster: DemandForecaster fed by recorded sales (a default one is created)
+        :param lock_stripes: number of locks SKUs are striped over
+        :param kpi: optional KPIEngine notified of stock changes
+        """
+        self.sku_ids = {}  # sku -> dense id
+        self.skus = []  # dense id -> sku
+        self.stock = np.zeros(initial_capacity, dtype=np.int64)  # available to sell
+        self.reserved = np.zeros(initial_capacity, dtype=np.int64)  # held by open orders
+        self.forecaster = forecaster or DemandForecaster(initial_capacity=initial_capacity)
+        self._stripes = [threading.Lock() for _ in range(lock_stripes)]
+        self._intern_lock = threading.Lock()
+        self.kpi = kpi
+
+    def _publish_stock(self, item_ids, deltas):
+        if self.kpi is not None:
+            self.kpi.publish(STOCK_CHANGED, item_ids=item_ids, deltas=deltas)
+
+    def _stripe(self, sku_id):
+        return self._stripes[sku_id % len(self._stripes)]
+
+    def _locked(self, sku_ids=None):
+        """Hold the stripes of the given SKU ids (all stripes if None), always in stripe order."""
+        if sku_ids is None:
+            stripes = self._stripes
+        else:
+            n = len(self._stripes)
+            stripes = [self._stripes[i] for i in sorted({s % n for s in sku_ids})]
+        stack = ExitStack()
+        for lock in stripes:
+            stack.enter_context(lock)
+        return stack
+
+    @property
+    def inventory(self):
+        """Snapshot of stock levels as a {item_id: quantity} dict."""
+        return dict(zip(self.skus, self.stock[:len(self.skus)].tolist()))
+
+    def _intern(self, item_id):
+        sku_id = self.sku_ids.get(item_id)
+        if sku_id is None:
+            with self._intern_lock:
+                sku_id = self.sku_ids.get(item_id)
+                if sku_id is None:
+                    sku_id = len(self.skus)
+                    if sku_id == len(self.stock):
+                        self._grow(sku_id + 1)
+                    self.skus.append(item_id)
+                    self.sku_ids[item_id] = sku_id
+        return sku_id
+
+    def _grow(self, needed):
+        # Copying while a stripe holder writes would lose its update, so take every stripe
+        with self._locked():
+            capacity = max(needed, 2 * len(self.stock))
+            for name in ("stock", "reserved"):
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype=np.int64)
+                new[:len(old)] = old
+                setattr(self, name, new)
+
+    def intern_skus(self, item_ids):
+        """
+        Map item ids to dense SKU ids, registering unknown ones.
+        Integer NumPy arrays are taken to be SKU ids already and returned as-is.
+        """
+        if isinstance(item_ids, np.ndarray) and item_ids.dtype.kind in "iu":
+            return item_ids
+        return np.fromiter((self._intern(i) for i in item_ids), dtype=np.int64)
 
     def check_stock(self, item_id):
         """
         Return current stock level for an item.
         """
-        return self.inventory.get(item_id, 0)
+        sku_id = self.sku_ids.get(item_id)
+        return 0 if sku_id is None else int(self.stock[sku_id])
+
+    def lookup_skus(self, item_ids):
+        """
+        Map item ids to dense SKU ids without registering anything; unknown items map to -1.
+        Integer NumPy arrays are taken to be SKU ids already and returned as-is.
+        """
+        if isinstance(item_ids, np.ndarray) and item_ids.dtype.kind in "iu":
+            return item_ids
+        return np.fromiter((self.sku_ids.get(i, -1) for i in item_ids), dtype=np.int64)
+
+    def check_stock_many(self, item_ids):
+        """
+        Return stock levels for many items as an int array (0 for unknown items).
+        """
+        ids = self.lookup_skus(item_ids)
+        return np.where(ids >= 0, self.stock[ids], 0)
+
+    @staticmethod
+    def _invalid_quantity(quantity):
+        """Describe a stock quantity that is not a whole number (or array of them); None if it is valid."""
+        if isinstance(quantity, np.ndarray):
+            if quantity.size and quantity.dtype.kind not in "iu":
+                return f"Invalid quantities of type {quantity.dtype}: stock is counted in whole units"
+        elif isinstance(quantity, bool) or not isinstance(quantity, numbers.Integral):
+            return f"Invalid quantity {quantity!r}: stock is counted in whole units"
+        return None
 
     def reorder_item(self, item_id, quantity):
         """
         Increase stock of an item by the given quantity.
+        :param quantity: whole number of units; anything else is rejected rather than truncated
         """
-        current = self.inventory.get(item_id, 0)
-        self.inventory[item_id] = current + quantity
+        error = self._invalid_quantity(quantity)
+        if error:
+            return {"status": "error", "message": error}
+        sku_id = self._intern(item_id)
+        with self._stripe(sku_id):
+            self.stock[sku_id] += quantity
+            updated = int(self.stock[sku_id])
+        self._publish_stock([item_id], [quantity])
         return {
             "status": "success",
             "item_id": item_id,
-            "updated_quantity": self.inventory[item_id]
+            "updated_quantity": updated
         }
 
+    def reorder_many(self, item_ids, quantities):
+        """
+        Increase stock of many items in one vectorized pass.
+        :param item_ids: iterable of item ids (or an int array of SKU ids)
+        :param quantities: whole-number scalar or array aligned with item_ids
+        :return: int array of stock levels after each entry, as if applied one at a time
+        :raises ValueError: if a quantity is not a whole number, since the ledger would truncate it
+        """
+        qty = np.asarray(quantities)
+        error = self._invalid_quantity(qty if qty.ndim else quantities)
+        if error:
+            raise ValueError(error)
+        ids = self.intern_skus(item_ids)
+        qty = np.broadcast_to(qty.astype(np.int64), ids.shape)
+        with self._locked():
+            before = self.stock[ids]
+            np.add.at(self.stock, ids, qty)
+        if self.kpi is not None:
+            self._publish_stock([self.skus[i] for i in ids.tolist()], qty.tolist())
+        return before + self._running_totals(ids, qty)
+
+    @staticmethod
+    def _running_totals(ids, qty):
+        """Per-entry cumulative quantity among entries for the same SKU, in input order."""
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        sums = np.cumsum(qty[order])
+        starts = np.ones(len(ids), dtype=bool)
+        starts[1:] = sorted_ids[1:] != sorted_ids[:-1]
+        first = np.maximum.accumulate(np.where(starts, np.arange(len(ids)), 0))
+        running = np.empty_like(sums)
+        running[order] = sums - (sums - qty[order])[first]
+        return running
+
+    def record_demand(self, items):
+        """
+        Feed sold order line items into the demand forecast.
+        :param items: iterable of {"item_id": ..., "qty": ...} line items
+        """
+        items = list(items)
+        if items:
+            ids = self.intern_skus(line["item_id"] for line in items)
+            self.forecaster.record(ids, [line.get("qty", 1) for line in items])
+
     def predict_demand(self, item_id):
         """
-        Stub demand forecast for an item.
+        Demand forecast for an item over the next period.
         """
-        return {"item_id": item_id, "forecast": 100}
+        sku_id = self.sku_ids.get(item_id)
+        if sku_id is None:
+            return {"item_id": item_id, "forecast": float(self.forecaster.default_forecast)}
+        return {"item_id": item_id, "forecast": float(self.forecaster.forecast([sku_id])[0])}
+
+    def predict_demand_many(self, item_ids=None, horizon=1):
+        """
+        Forecast demand for many items (the whole catalog if item_ids is None) in one pass.
+        Unknown items get the default forecast and are not added to the catalog.
+        :return: float array aligned with item_ids
+        """
+        ids = np.arange(len(self.skus)) if item_ids is None else self.lookup_skus(item_ids)
+        return self._forecast(ids, horizon)
+
+    def _forecast(self, ids, horizon):
+        known = ids >= 0
+        if known.all():
+            return self.forecaster.forecast(ids, horizon)
+        forecast = np.full(len(ids), float(self.forecaster.default_forecast) * horizon)
+        forecast[known] = self.forecaster.forecast(ids[known], horizon)
+        return forecast
+
+    def restock_quantities(self, item_ids=None, cover_periods=7, safety_stock=0):
+        """
+        Quantities needed to cover forecast demand for cover_periods plus safety stock.
+        Unknown items count as out of stock and are not added to the catalog.
+        :return: int array aligned with item_ids (whole catalog if None)
+        """
+        ids = np.arange(len(self.skus)) if item_ids is None else self.lookup_skus(item_ids)
+        target = np.ceil(self._forecast(ids, cover_periods)).astype(np.int64) + safety_stock
+        return np.maximum(target - np.where(ids >= 0, self.stock[ids], 0), 0)
 
     def restock_item(self, item_id, quantity=10):
         """
@@ -32,3 +228,117 @@ class InventoryModule:
         Default restock quantity is 10 unless specified.
         """
         return self.reorder_item(item_id, quantity)
+
+    def restock_many(self, item_ids, quantity=10):
+        """
+        Restock many items at once; quantity may be a scalar or an aligned array.
+        """
+        return self.reorder_many(item_ids, quantity)
+
+    def restock_item_batch(self, params_list):
+        """
+        Bulk entry point for restock_item used by ERPAgent.act_batch.
+        :param params_list: list of restock_item keyword dicts
+        :return: list of results aligned with params_list
+        """
+        errors = [self._invalid_quantity(params.get("quantity", 10)) for params in params_list]
+        valid = [params for params, error in zip(params_list, errors) if error is None]
+        updated = iter(self.reorder_many([params["item_id"] for params in valid],
+                                         [params.get("quantity", 10) for params in valid]).tolist())
+        return [{"status": "error", "message": error} if error else {
+            "status": "success",
+            "item_id": params["item_id"],
+            "updated_quantity": next(updated)
+        } for params, error in zip(params_list, errors)]
+
+    def items_below(self, threshold):
+        """
+        Return the item ids whose stock is below threshold (vectorized).
+        """
+        ids = np.flatnonzero(self.stock[:len(self.skus)] < threshold)
+        return [self.skus[i] for i in ids.tolist()]
+
+    def restock_below(self, threshold, quantity=None, cover_periods=7, default_quantity=10):
+        """
+        Restock every item below threshold in one pass.
+        Without an explicit quantity, each item with sales history is topped up to its
+        forecast demand over cover_periods, and at least up to threshold; items without
+        history get default_quantity rather than a guess from the default forecast.
+        """
+        if quantity is not None:
+            error = self._invalid_quantity(np.asarray(quantity) if np.ndim(quantity) else quantity)
+            if error:
+                return {"status": "error", "message": error}
+        with self._locked():
+            ids = np.flatnonzero(self.stock[:len(self.skus)] < threshold)
+            if quantity is None:
+                forecast = np.maximum(self.restock_quantities(ids, cover_periods),
+                                      threshold - self.stock[ids])
+                quantity = np.where(self.forecaster.has_history(ids), forecast, default_quantity)
+            self.stock[ids] += quantity
+        if self.kpi is not None:
+            self._publish_stock([self.skus[i] for i in ids.tolist()],
+                                np.broadcast_to(quantity, ids.shape).tolist())
+        return {
+            "status": "success",
+            "restocked": len(ids),
+            "items": [self.skus[i] for i in ids.tolist()]
+        }
+
+    @staticmethod
+    def _invalid_line(items):
+        """Describe the first line item without an item_id or a positive integer qty; None if all are valid."""
+        for line in items:
+            if not isinstance(line, dict) or "item_id" not in line:
+                return f"Line item {line!r} has no item_id"
+            qty = line.get("qty")
+            if isinstance(qty, bool) or not isinstance(qty, numbers.Integral) or qty <= 0:
+                return f"Invalid quantity {qty!r} for item {line['item_id']}"
+        return None
+
+    def _line_totals(self, items):
+        """Sum line item quantities per SKU id; lines must have passed _invalid_line."""
+        totals = {}
+        for line in items:
+            sku_id = self._intern(line["item_id"])
+            totals[sku_id] = totals.get(sku_id, 0) + int(line["qty"])
+        return totals
+
+    def reserve_items(self, items):
+        """
+        Atomically reserve stock for every line item of an order: all or nothing.
+        Only the stripes of the order's SKUs are locked, in a fixed order, so
+        concurrent orders over disjoint SKUs proceed in parallel without deadlock.
+        :param items: iterable of {"item_id": ..., "qty": ...} line items; qty must be a positive integer
+        """
+        items = list(items)
+        error = self._invalid_line(items)
+        if error:
+            return {"status": "error", "message": error}
+        totals = self._line_totals(items)
+        with self._locked(totals):
+            shortages = [{"item_id": self.skus[s], "requested": q, "available": int(self.stock[s])}
+                         for s, q in totals.items() if self.stock[s] < q]
+            if shortages:
+                return {"status": "error", "message": "Insufficient stock", "shortages": shortages}
+            for sku_id, qty in totals.items():
+                self.stock[sku_id] -= qty
+                self.reserved[sku_id] += qty
+        self._publish_stock([self.skus[s] for s in totals], [-q for q in totals.values()])
+        return {"status": "success", "reserved": {self.skus[s]: q for s, q in totals.items()}}
+
+    def release_items(self, items):
+        """
+        Return reserved stock for an order's line items to available stock.
+        """
+        items = list(items)
+        error = self._invalid_line(items)
+        if error:
+            return {"status": "error", "message": error}
+        totals = self._line_totals(items)
+        with self._locked(totals):
+            for sku_id, qty in totals.items():
+                self.reserved[sku_id] -= qty
+                self.stock[sku_id] += qty
+        self._publish_stock([self.skus[s] for s in totals], list(totals.values()))
+        return {"status": "success", "released": {self.skus[s]: q for s, q in totals.items()}}
@@ -1,132 +1,229 @@
-import json
-import os
+import itertools
 from collections import Counter
+from modules.goal_index import TokenIndex, MinHashIndex, PriorityIndex, tokenize, jaccard
+from modules.goal_journal import GoalJournal
+from modules.rule_engine import RuleEngine
 
 class PlannerModule:
     """
     ERP Planning / Decision Support module with persistent goals.
     Includes similarity detection with configurable threshold.
+    Goal changes are journaled and periodically compacted into save_file.
     """
 
-    def __init__(self, save_file="planner_goals.json", similarity_threshold=0.5):
-        self.goals = []
+    def __init__(self, save_file="planner_goals.json", similarity_threshold=0.5,
+                 similarity_index="inverted", minhash_perm=64, lsh_bands=16, compact_every=1000,
+                 rules_file="planner_rules.json"):
+        """
+        :param save_file: JSON file goals are persisted to
+        :param similarity_threshold: Jaccard score at or above which goals count as similar
+        :param similarity_index: "inverted" (exact) or "minhash" (LSH, for very large goal sets)
+        :param minhash_perm: MinHash signature length in "minhash" mode
+        :param lsh_bands: number of LSH bands in "minhash" mode
+        :param compact_every: journal entries between automatic snapshot compactions
+        :param rules_file: JSON goal-to-action rules (see modules.rule_engine); defaults apply if missing
+        """
+        # goal key (lower-cased text) -> goal dict, in insertion order
+        self._goals = {}
+        self._seq = {}
+        self._next_seq = 0
+        # cached goal -> action classification, recomputed only for goals in _dirty
+        self._rules = RuleEngine.from_file(rules_file)
+        self._goal_actions = {}
+        self._action_counts = Counter()
+        self._dirty = set()
+        # priority-ordered view of the goals and the cached analyze_goals() result
+        self._priorities = PriorityIndex()
+        self._analysis = None
+        if similarity_index == "minhash":
+            self._index = MinHashIndex(minhash_perm, lsh_bands)
+        else:
+            self._index = TokenIndex()
         self.next_actions = []
         self.save_file = save_file
+        self._journal = GoalJournal(save_file, compact_every)
         self.similarity_threshold = similarity_threshold  # configurable
         self.load_goals()  # load goals on startup
 
+    @property
+    def goals(self):
+        """Current goals, in insertion order."""
+        return list(self._goals.values())
+
+    @goals.setter
+    def goals(self, goals):
+        for key in list(self._goals):
+            self._unindex(key)
+        for g in goals:
+            self._insert(g)
+
+    def _insert(self, g: dict):
+        key = g["goal"].lower()
+        self._goals[key] = g
+        self._seq[key] = self._next_seq
+        self._next_seq += 1
+        self._index.add(key, tokenize(g["goal"]))
+        self._dirty.add(key)
+        self._priorities.add(key, self._seq[key], g["priority"])
+        self._analysis = None
+
+    def _unindex(self, key: str):
+        self._index.remove(key)
+        self._priorities.remove(self._seq[key], self._goals[key]["priority"])
+        self._analysis = None
+        del self._seq[key]
+        self._dirty.discard(key)
+        action = self._goal_actions.pop(key, None)
+        if action is not None:
+            self._action_counts[action] -= 1
+        return self._goals.pop(key)
+
     def _similarity(self, goal1: str, goal2: str) -> float:
         """
         Compute a simple similarity score between two goals using token overlap (Jaccard).
         Returns a float between 0 and 1.
         """
-        tokens1 = set(goal1.lower().split())
-        tokens2 = set(goal2.lower().split())
-        if not tokens1 or not tokens2:
-            return 0.0
-        intersection = tokens1 & tokens2
-        union = tokens1 | tokens2
-        return len(intersection) / len(union)
+        return jaccard(tokenize(goal1), tokenize(goal2))
 
     def find_similar_goals(self, goal: str):
         """Return list of goals that are similar to the given goal above threshold."""
+        hits = self._index.query(tokenize(goal), self.similarity_threshold)
+        # report matches in goal insertion order, as a full scan would
+        hits.sort(key=lambda hit: self._seq[hit[0]])
         similar = []
-        for g in self.goals:
-            score = self._similarity(goal, g["goal"])
-            if score >= self.similarity_threshold:
-                similar.append({"goal": g["goal"], "priority": g["priority"], "similarity": score})
+        for key, score in hits:
+            g = self._goals[key]
+            similar.append({"goal": g["goal"], "priority": g["priority"], "similarity": score})
         return similar
 
-    def add_goal(self, goal: str, priority: int = 1):
+    def add_goal(self, goal: str, priority: int = 1, allow_similar: bool = False):
         """
         Add a new goal. If a similar goal exists above threshold, return warning.
         If exact duplicate, update priority instead of adding.
+        :param allow_similar: add the goal even if similar goals exist
+        """
+        result, op = self._add(goal, priority, allow_similar)
+        self._journal_ops([op] if op else [])
+        return result
+
+    def add_goals(self, goals, allow_similar: bool = False):
         """
+        Add many goals with one similarity pass and a single durable journal write.
+        :param goals: iterable of goal strings, (goal, priority) pairs or {"goal", "priority"} dicts
+        :return: list of per-goal results, as add_goal would return them
+        """
+        results, ops = [], []
+        for item in goals:
+            if isinstance(item, str):
+                goal, priority = item, 1
+            elif isinstance(item, dict):
+                goal, priority = item["goal"], item.get("priority", 1)
+            else:
+                goal, priority = item
+            result, op = self._add(goal, priority, allow_similar)
+            results.append(result)
+            if op:
+                ops.append(op)
+        self._journal_ops(ops)
+        return results
+
+    def _add(self, goal: str, priority: int, allow_similar: bool):
+        """Apply an add in memory; return the add_goal result and the journal entry to persist."""
         # Exact duplicate check
-        existing = [g for g in self.goals if g["goal"].lower() == goal.lower()]
+        match = self._goals.get(goal.lower())
+        existing = [match] if match else []
         if existing:
-            for g in existing:
-                g["priority"] = priority
-            self.save_goals()
+            changed = [self._set_priority(g, priority) for g in existing]
+            # Re-adding a goal at its current priority changes nothing, so nothing is journaled
             return {
                 "status": "duplicate",
                 "message": f"Exact goal already exists: {[g['goal'] for g in existing]}",
                 "existing_goals": existing
-            }
+            }, {"op": "priority", "goal": goal, "priority": priority} if any(changed) else None
 
         # Similarity check
-        similar = self.find_similar_goals(goal)
+        similar = [] if allow_similar else self.find_similar_goals(goal)
         if similar:
             return {
                 "status": "similar",
                 "message": f"Similar goals detected for '{goal}'",
                 "similar_goals": similar
-            }
+            }, None
 
         # Add new goal
-        self.goals.append({"goal": goal, "priority": priority})
-        self.save_goals()
-        return {"status": "success", "message": f"Goal '{goal}' added successfully."}
+        self._insert({"goal": goal, "priority": priority})
+        return ({"status": "success", "message": f"Goal '{goal}' added successfully."},
+                {"op": "add", "goal": goal, "priority": priority})
+
+    def _set_priority(self, g: dict, priority: int):
+        """Change a goal's priority; returns False if it already had that priority."""
+        if g["priority"] == priority:
+            return False
+        key = g["goal"].lower()
+        self._priorities.remove(self._seq[key], g["priority"])
+        g["priority"] = priority
+        self._priorities.add(key, self._seq[key], priority)
+        self._analysis = None
+        return True
 
     def remove_goal(self, goal: str):
         """Remove a goal by its name."""
-        self.goals = [g for g in self.goals if g["goal"].lower() != goal.lower()]
-        self.save_goals()
+        if goal.lower() in self._goals:
+            self._unindex(goal.lower())
+            self._journal_ops([{"op": "remove", "goal": goal}])
+
+    def _journal_ops(self, ops: list):
+        self._journal.append(ops)
+        if self._journal.needs_compaction():
+            self.save_goals()
 
     def save_goals(self):
-        """Save current goals to a JSON file."""
-        with open(self.save_file, "w") as f:
-            json.dump(self.goals, f, indent=2)
+        """Save current goals to a JSON snapshot (atomically) and reset the journal."""
+        self._journal.compact(self.goals)
 
     def load_goals(self):
-        """Load goals from JSON file if it exists, deduplicating entries."""
-        if os.path.exists(self.save_file):
-            with open(self.save_file, "r") as f:
-                loaded_goals = json.load(f)
-            unique = {}
-            for g in loaded_goals:
-                key = g["goal"].lower()
-                if key not in unique or g["priority"] > unique[key]["priority"]:
-                    unique[key] = g
-            self.goals = list(unique.values())
-            self.save_goals()
+        """Load goals from the snapshot and journal if they exist, deduplicating entries."""
+        self.goals = self._journal.load()
 
     def analyze_goals(self):
         """Return a summary analysis of current goals, including counts per priority."""
-        if not self.goals:
+        if not self._goals:
             return {"status": "error", "analysis": "No goals defined"}
 
-        sorted_goals = sorted(self.goals, key=lambda g: g["priority"], reverse=True)
-        priority_counts = Counter(g["priority"] for g in sorted_goals)
+        # Cached until the next add, remove or priority change
+        if self._analysis is None:
+            sorted_goals = self.top_goals()
+            analysis = {
+                "total_goals": len(sorted_goals),
+                "top_priority": sorted_goals[0]["goal"],
+                "all_goals": [f'{g["goal"]} (Priority {g["priority"]})' for g in sorted_goals],
+                "priority_summary": {f"Priority {p}": c for p, c in self._priorities.counts().items()}
+            }
+            self._analysis = {"status": "success", "analysis": analysis}
+        return self._analysis
 
-        analysis = {
-            "total_goals": len(sorted_goals),
-            "top_priority": sorted_goals[0]["goal"],
-            "all_goals": [f'{g["goal"]} (Priority {g["priority"]})' for g in sorted_goals],
-            "priority_summary": {f"Priority {p}": c for p, c in sorted(priority_counts.items(), reverse=True)}
-        }
-        return {"status": "success", "analysis": analysis}
+    def top_priority_goal(self):
+        """Return the highest-priority goal (earliest added on ties), or None. O(1)."""
+        key = self._priorities.top()
+        return self._goals[key] if key is not None else None
+
+    def top_goals(self, k: int = None):
+        """Return the k highest-priority goals (all if k is None), highest first. O(k)."""
+        return [self._goals[key] for key in itertools.islice(self._priorities.ordered(), k)]
 
     def plan_next_actions(self):
         """Generate next actions based on current goals, avoiding duplicates."""
-        if not self.goals:
+        if not self._goals:
             return {"status": "error", "next_actions": [], "message": "No goals to plan actions for"}
 
-        actions_set = set()
-        for g in self.goals:
-            goal = g["goal"].lower()
-            if "inventory" in goal:
-                actions_set.add("optimize_inventory")
-            elif "cost" in goal or "expense" in goal:
-                actions_set.add("reduce_costs")
-            elif "growth" in goal or "sales" in goal:
-                actions_set.add("increase_sales")
-            elif "efficiency" in goal or "process" in goal:
-                actions_set.add("improve_processes")
-            else:
-                actions_set.add("review_strategy")
+        # Only goals added since the last review need classifying
+        for key in self._dirty:
+            action = self._rules.classify(self._goals[key]["goal"])
+            self._goal_actions[key] = action
+            self._action_counts[action] += 1
+        self._dirty.clear()
 
-        self.next_actions = list(actions_set)
+        self.next_actions = [a for a in self._rules.action_order() if self._action_counts[a] > 0]
         return {"status": "success", "next_actions": self.next_actions}
 
     def review_goals(self):
@@ -138,3 +235,11 @@ class PlannerModule:
             "analysis": analysis.get("analysis"),
             "next_actions": actions.get("next_actions", [])
         }
+
+    def review_goals_batch(self, params_list):
+        """
+        Bulk entry point for review_goals used by ERPAgent.act_batch.
+        A review has no inputs, so it runs once and is shared by the whole batch.
+        """
+        review = self.review_goals()
+        return [review] * len(params_list)
@@ -0,0 +1,101 @@
+"""
+Data-driven goal-to-action rules for PlannerModule.
+All rule keywords are compiled into a single Aho-Corasick automaton, so a goal
+is classified in one pass over its text regardless of the number of rules.
+"""
+
+import json
+import os
+from collections import deque
+
+# Equivalent to the planner's original if/elif chain: the first matching rule wins
+DEFAULT_RULES = {
+    "rules": [
+        {"keywords": ["inventory"], "action": "optimize_inventory"},
+        {"keywords": ["cost", "expense"], "action": "reduce_costs"},
+        {"keywords": ["growth", "sales"], "action": "increase_sales"},
+        {"keywords": ["efficiency", "process"], "action": "improve_processes"}
+    ],
+    "default_action": "review_strategy"
+}
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher."""
+
+    def __init__(self, patterns: dict):
+        """
+        :param patterns: {keyword: payload}; payloads of every keyword found are reported by match()
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [set()]
+        for keyword, payload in patterns.items():
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                state = nxt
+            self.out[state].add(payload)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0) if self.goto[f].get(ch, 0) != nxt else 0
+                self.out[nxt] |= self.out[self.fail[nxt]]
+
+    def match(self, text: str) -> set:
+        """Return the payloads of all keywords occurring in text."""
+        found = set()
+        state = 0
+        goto, fail, out = self.goto, self.fail, self.out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class RuleEngine:
+    def __init__(self, config: dict = None):
+        """
+        :param config: {"rules": [{"keywords": [...], "action": ...}, ...], "default_action": ...}
+        """
+        config = config or DEFAULT_RULES
+        self.actions = [rule["action"] for rule in config["rules"]]
+        self.default_action = config.get("default_action", "review_strategy")
+        # a keyword shared by several rules resolves to the earliest one
+        patterns = {}
+        for i, rule in enumerate(config["rules"]):
+            for keyword in rule["keywords"]:
+                patterns.setdefault(keyword.lower(), i)
+        self.matcher = AhoCorasick(patterns)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """Load rules from a JSON file, falling back to DEFAULT_RULES if it does not exist."""
+        if path and os.path.exists(path):
+            with open(path, "r") as f:
+                return cls(json.load(f))
+        return cls()
+
+    def classify(self, goal: str) -> str:
+        """Return the action of the first rule with a keyword in the goal."""
+        matched = self.matcher.match(goal.lower())
+        return self.actions[min(matched)] if matched else self.default_action
+
+    def action_order(self):
+        """All actions in rule order, followed by the default action."""
+        return list(dict.fromkeys(self.actions + [self.default_action]))
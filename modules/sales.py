@@ -1,35 +1,192 @@
+import threading
+
+from utils.kpi import ORDER_CANCELLED, ORDER_CREATED, ORDER_STATUS_CHANGED
+
+
 class SalesModule:
-    def __init__(self):
+    def __init__(self, inventory=None, kpi=None):
+        """
+        :param inventory: optional InventoryModule; orders placed through process_order
+                          reserve its stock and feed its demand forecast
+        :param kpi: optional KPIEngine notified of order changes
+        """
         self.orders = {}
         self.next_id = 1
+        self.inventory = inventory
+        self._reservations = {}  # order_id -> line items held in inventory
+        # Secondary indexes: key -> set of order ids
+        self._by_customer = {}
+        self._by_status = {}
+        self._by_item = {}
+        self._lock = threading.Lock()
+        self.kpi = kpi
 
-    def create_order(self, order_data):
+    def _allocate_ids(self, count):
+        """Reserve `count` consecutive order IDs and return the first one."""
+        with self._lock:
+            first_id = self.next_id
+            self.next_id += count
+        return first_id
+
+    @staticmethod
+    def _status(order):
+        return order.get("status", "open")
+
+    @staticmethod
+    def _item_ids(order):
+        return {line["item_id"] for line in order.get("items", [])}
+
+    def _index(self, order_id, order):
+        self._by_customer.setdefault(order.get("customer"), set()).add(order_id)
+        self._by_status.setdefault(self._status(order), set()).add(order_id)
+        for item_id in self._item_ids(order):
+            self._by_item.setdefault(item_id, set()).add(order_id)
+
+    @staticmethod
+    def _discard(index, key, order_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(order_id)
+            if not ids:
+                del index[key]
+
+    def _unindex(self, order_id, order):
+        self._discard(self._by_customer, order.get("customer"), order_id)
+        self._discard(self._by_status, self._status(order), order_id)
+        for item_id in self._item_ids(order):
+            self._discard(self._by_item, item_id, order_id)
+
+    def _store(self, order_id, order_data, reserved=None):
         """
-        Create a new order and assign it an ID.
+        Publish an order under its id.
+        :param reserved: line items held in inventory for it, recorded as the order becomes
+                         visible so a concurrent cancel_order always finds and releases them
         """
-        order_id = self.next_id
-        self.orders[order_id] = order_data
-        self.next_id += 1
+        with self._lock:
+            self.orders[order_id] = order_data
+            self._index(order_id, order_data)
+            if reserved is not None:
+                self._reservations[order_id] = reserved
+        if self.inventory is not None:
+            self.inventory.record_demand(order_data.get("items", []))
+        if self.kpi is not None:
+            self.kpi.publish(ORDER_CREATED, order_id=order_id, customer=order_data.get("customer"),
+                             status=self._status(order_data), items=order_data.get("items", []))
         return {
             "status": "success",
             "order_id": order_id,
             "data": order_data
         }
 
+    def create_order(self, order_data):
+        """
+        Create a new order and assign it an ID.
+        """
+        return self._store(self._allocate_ids(1), order_data)
+
+    def create_orders(self, batch):
+        """
+        Create many orders with one contiguous range of order IDs.
+        :param batch: list of order dicts
+        :return: list of results aligned with batch
+        """
+        first_id = self._allocate_ids(len(batch))
+        return [self._store(order_id, order_data)
+                for order_id, order_data in enumerate(batch, start=first_id)]
+
+    def _reserve(self, order):
+        """Reserve the order's line items; return an error result if a line is invalid or stock is short, else None."""
+        if self.inventory is None:
+            return None
+        reservation = self.inventory.reserve_items(order.get("items", []))
+        if reservation["status"] != "success":
+            error = {"status": "error", "message": reservation["message"]}
+            if "shortages" in reservation:
+                error["shortages"] = reservation["shortages"]
+            return error
+        return None
+
+    def _reserved(self, order):
+        """Line items held for an order placed through process_order, or None without inventory."""
+        return order.get("items", []) if self.inventory is not None else None
+
     def process_order(self, order):
         """
-        Wrapper for create_order so the agent can call process_order.
+        Reserve stock for the order's line items, then create the order.
+        Nothing is created if any line cannot be fully reserved.
         :param order: dict with order details
         """
-        return self.create_order(order)
+        error = self._reserve(order)
+        if error:
+            return error
+        return self._store(self._allocate_ids(1), order, self._reserved(order))
+
+    def process_order_batch(self, params_list):
+        """
+        Bulk entry point for process_order used by ERPAgent.act_batch.
+        Allocates one contiguous range of order IDs for the orders whose stock was reserved.
+        :param params_list: list of process_order keyword dicts
+        """
+        errors = [self._reserve(params["order"]) for params in params_list]
+        order_id = self._allocate_ids(errors.count(None))
+        results = []
+        for params, error in zip(params_list, errors):
+            if error is not None:
+                results.append(error)
+                continue
+            results.append(self._store(order_id, params["order"], self._reserved(params["order"])))
+            order_id += 1
+        return results
+
+    def find_orders(self, customer=None, status=None, item_id=None):
+        """
+        Return {order_id: order} for orders matching every given filter, by order id.
+        Intersects the secondary indexes starting from the smallest, so the cost
+        follows the size of the smallest matching index rather than the order book.
+        With no filters, every order is returned.
+        """
+        filters = [index.get(key, set()) for index, key in (
+            (self._by_customer, customer), (self._by_status, status), (self._by_item, item_id))
+            if key is not None]
+        if not filters:
+            return dict(self.orders)
+        filters.sort(key=len)
+        ids = filters[0]
+        for other in filters[1:]:
+            ids = ids & other
+            if not ids:
+                break
+        return {order_id: self.orders[order_id] for order_id in sorted(ids)}
+
+    def count_orders(self, customer=None, status=None, item_id=None):
+        """
+        Number of orders matching the filters; O(1) for zero or one filter.
+        """
+        given = [(index, key) for index, key in (
+            (self._by_customer, customer), (self._by_status, status), (self._by_item, item_id))
+            if key is not None]
+        if not given:
+            return len(self.orders)
+        if len(given) == 1:
+            index, key = given[0]
+            return len(index.get(key, ()))
+        return len(self.find_orders(customer, status, item_id))
 
     def update_order_status(self, order_id, status):
         """
         Update the status of an existing order.
         """
-        if order_id not in self.orders:
-            return {"status": "error", "message": f"Order {order_id} not found"}
-        self.orders[order_id]["status"] = status
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return {"status": "error", "message": f"Order {order_id} not found"}
+            old_status = self._status(order)
+            self._discard(self._by_status, old_status, order_id)
+            order["status"] = status
+            self._by_status.setdefault(status, set()).add(order_id)
+        if self.kpi is not None:
+            self.kpi.publish(ORDER_STATUS_CHANGED, order_id=order_id,
+                             old_status=old_status, new_status=status)
         return {
             "status": "success",
             "order_id": order_id,
@@ -38,13 +195,59 @@ class SalesModule:
 
     def cancel_order(self, order_id):
         """
-        Cancel an existing order.
+        Cancel an existing order, returning any stock it reserved.
         """
-        if order_id not in self.orders:
-            return {"status": "error", "message": f"Order {order_id} not found"}
-        self.orders.pop(order_id)
+        with self._lock:
+            order = self.orders.pop(order_id, None)
+            if order is None:
+                return {"status": "error", "message": f"Order {order_id} not found"}
+            self._unindex(order_id, order)
+            items = self._reservations.pop(order_id, None)
+        if self.kpi is not None:
+            self.kpi.publish(ORDER_CANCELLED, order_id=order_id,
+                             status=self._status(order), items=order.get("items", []))
+        if items:
+            self.inventory.release_items(items)
         return {
             "status": "success",
             "order_id": order_id,
             "status": "cancelled"
         }
+
+
+if __name__ == "__main__":
+    # Stress check: concurrent orders never oversell, and throughput by thread count
+    import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    from modules.inventory import InventoryModule
+
+    SKUS = [f"SKU{i:04d}" for i in range(500)]
+    ORDERS = 40000
+
+    def make_orders(seed):
+        rng = random.Random(seed)
+        return [{"customer": f"C{rng.randrange(1000)}",
+                 "items": [{"item_id": rng.choice(SKUS), "qty": rng.randint(1, 3)}
+                           for _ in range(rng.randint(1, 4))]}
+                for _ in range(ORDERS)]
+
+    for threads in (1, 2, 4, 8):
+        inventory = InventoryModule()
+        inventory.reorder_many(SKUS, 150)
+        sales = SalesModule(inventory=inventory)
+        orders = make_orders(threads)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(sales.process_order, orders))
+        elapsed = time.perf_counter() - start
+
+        placed = [o for o, r in zip(orders, results) if r["status"] == "success"]
+        sold = sum(line["qty"] for o in placed for line in o["items"])
+        n = len(inventory.skus)
+        assert (inventory.stock[:n] >= 0).all(), "oversold"
+        assert inventory.reserved[:n].sum() == sold
+        assert inventory.stock[:n].sum() + sold == 150 * len(SKUS)
+        print(f"{threads} threads: {ORDERS / elapsed:,.0f} orders/s, "
+              f"{len(placed)} placed, {ORDERS - len(placed)} rejected")
@@ -0,0 +1,228 @@
+"""
+Bounded, prioritized agent inboxes.
+A Mailbox replaces an agent's unbounded queue.Queue: it holds one FIFO lane per
+priority and always serves the most urgent non-empty lane first, caps the number
+of queued messages with a configurable overflow policy, and records depth and
+queueing-latency metrics. It keeps queue.Queue's get/get_nowait/qsize interface.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+# Lower numbers are served first. Responses unblock waiting requesters, so they go ahead
+# of new requests, and bulk events go last.
+DEFAULT_PRIORITIES = {"response": 0, "request": 1, "event": 2}
+DEFAULT_PRIORITY = 1  # for message types missing from the priority map
+
+BLOCK = "block"  # put() waits for room (up to block_timeout), then raises MailboxFull
+DROP_OLDEST = "drop_oldest"  # the oldest message of the least urgent lane makes room
+REJECT = "reject"  # put() raises MailboxFull immediately
+POLICIES = (BLOCK, DROP_OLDEST, REJECT)
+
+_LATENCY_SAMPLES = 1024  # recent queueing latencies kept for percentiles
+
+
+class MailboxFull(queue.Full):
+    """Raised when a message cannot be queued for an agent."""
+
+
+class Mailbox:
+    def __init__(self, maxsize: int = 0, policy: str = BLOCK, priorities: dict = None,
+                 block_timeout: float = None):
+        """
+        :param maxsize: messages queued across all lanes before the policy applies (0: unbounded)
+        :param policy: overflow policy, one of "block", "drop_oldest", "reject"
+        :param priorities: {msg_type: priority}, lower is more urgent (default DEFAULT_PRIORITIES);
+                           a message's own priority, if set, takes precedence
+        :param block_timeout: longest a "block" put waits for room (None: indefinitely)
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.priorities = DEFAULT_PRIORITIES if priorities is None else dict(priorities)
+        self.block_timeout = block_timeout
+        self._lanes = {}  # priority -> deque of (enqueued_at, message)
+        self._order = []  # priorities of existing lanes, most urgent first
+        self._size = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+
+    def priority_of(self, message):
+        priority = getattr(message, "priority", None)
+        if priority is not None:
+            return priority
+        return self.priorities.get(message.msg_type, DEFAULT_PRIORITY)
+
+    def put(self, message, block: bool = True, timeout: float = None):
+        """
+        Queue a message in its priority lane, applying the overflow policy when full.
+        :param block: False makes a "block" mailbox fail immediately instead of waiting
+        :param timeout: overrides block_timeout for this call
+        :raises MailboxFull: the message was not queued
+        """
+        priority = self.priority_of(message)
+        with self._lock:
+            if self.maxsize and self._size >= self.maxsize:
+                if self.policy == BLOCK and block:
+                    wait = self.block_timeout if timeout is None else timeout
+                    if not self._not_full.wait_for(lambda: self._size < self.maxsize, wait):
+                        self.rejected += 1
+                        raise MailboxFull(f"Mailbox full ({self.maxsize} messages)")
+                elif self.policy == DROP_OLDEST:
+                    # Lanes are kept once created, so skip the ones that have drained
+                    least_urgent = next(p for p in reversed(self._order) if self._lanes[p])
+                    if priority > least_urgent:
+                        # Everything queued is more urgent than the newcomer: it is the oldest to lose
+                        self.dropped += 1
+                        return
+                    self._pop(least_urgent)
+                    self.dropped += 1
+                else:
+                    self.rejected += 1
+                    raise MailboxFull(f"Mailbox full ({self.maxsize} messages)")
+            lane = self._lanes.get(priority)
+            if lane is None:
+                lane = self._lanes[priority] = deque()
+                self._order.append(priority)
+                self._order.sort()
+            lane.append((time.monotonic(), message))
+            self._size += 1
+            self.enqueued += 1
+            if self._size > self.max_depth:
+                self.max_depth = self._size
+            self._not_empty.notify()
+
+    def put_nowait(self, message):
+        self.put(message, block=False)
+
+    def get(self, block: bool = True, timeout: float = None):
+        """Next message from the most urgent non-empty lane; raises queue.Empty if none arrives in time."""
+        with self._lock:
+            if not self._size:
+                if not block or not self._not_empty.wait_for(lambda: self._size, timeout):
+                    raise queue.Empty
+            message = self._take(time.monotonic())
+            self._not_full.notify()
+            return message
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_many(self, max_n: int, timeout: float = None):
+        """
+        Wait up to timeout for one message (0: don't wait, None: indefinitely), then take up to
+        max_n in priority order under a single lock acquisition.
+        """
+        with self._lock:
+            if not self._size:
+                if timeout == 0 or not self._not_empty.wait_for(lambda: self._size, timeout):
+                    return []
+            now = time.monotonic()
+            messages = [self._take(now) for _ in range(min(max_n, self._size))]
+            self._not_full.notify(len(messages))
+            return messages
+
+    def _take(self, now):
+        """Dequeue from the most urgent non-empty lane and record its latency; caller holds the lock."""
+        for priority in self._order:
+            if self._lanes[priority]:
+                enqueued_at, message = self._pop(priority)
+                break
+        latency = now - enqueued_at
+        self.dequeued += 1
+        self._latency_total += latency
+        if latency > self._latency_max:
+            self._latency_max = latency
+        self._latencies.append(latency)
+        return message
+
+    def _pop(self, priority):
+        item = self._lanes[priority].popleft()
+        self._size -= 1
+        return item
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return not self._size
+
+    def stats(self):
+        """Depth per lane, overflow counters and queueing latency (enqueue to dequeue) in seconds."""
+        with self._lock:
+            samples = sorted(self._latencies)
+            return {
+                "depth": self._size,
+                "depth_by_priority": {p: len(self._lanes[p]) for p in self._order if self._lanes[p]},
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "enqueued": self.enqueued,
+                "dequeued": self.dequeued,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "latency_avg": self._latency_total / self.dequeued if self.dequeued else 0.0,
+                "latency_p50": samples[len(samples) // 2] if samples else 0.0,
+                "latency_p99": samples[int(len(samples) * 0.99)] if samples else 0.0,
+                "latency_max": self._latency_max
+            }
+
+
+if __name__ == "__main__":
+    # Overload demo: a consumer at ~2k msg/s fed bulk events at full speed, plus a trickle of
+    # urgent messages. Shows bounded depth per policy and how long urgent messages wait.
+    from types import SimpleNamespace
+
+    BULK = 20000
+    URGENT_EVERY = 200
+
+    def run(**options):
+        mailbox = Mailbox(**options)
+        urgent_waits = []
+        done = threading.Event()
+
+        def consume():
+            while not done.is_set() or mailbox.qsize():
+                try:
+                    message = mailbox.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if message.msg_type == "urgent":
+                    urgent_waits.append(time.monotonic() - message.sent_at)
+                time.sleep(0.0005)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        start = time.perf_counter()
+        for n in range(BULK):
+            msg_type = "urgent" if n % URGENT_EVERY == 0 else "event"
+            try:
+                mailbox.put(SimpleNamespace(msg_type=msg_type, priority=None, sent_at=time.monotonic()))
+            except MailboxFull:
+                pass
+        produced = time.perf_counter() - start
+        done.set()
+        consumer.join()
+        stats = mailbox.stats()
+        urgent_waits.sort()
+        return (f"max depth {stats['max_depth']:>6}  dropped {stats['dropped']:>6}  rejected {stats['rejected']:>6}  "
+                f"producer {produced:6.2f}s  urgent wait p50 {urgent_waits[len(urgent_waits) // 2] * 1e3:8.1f}ms")
+
+    priorities = {"urgent": 0, "event": 2}
+    print("unbounded FIFO         ", run(priorities={}))
+    print("unbounded priority     ", run(priorities=priorities))
+    for policy in POLICIES:
+        print(f"maxsize 500 {policy:<11}", run(maxsize=500, policy=policy, priorities=priorities))
@@ -0,0 +1,300 @@
+"""
+Transports underneath A2AChannel.
+A transport owns the inboxes of the agents registered through it and delivers
+messages to agents wherever they live. InProcessTransport connects threads of
+one process; UnixSocketTransport connects agents across processes on one host,
+shipping messages in A2AMessage's binary encoding over Unix datagram sockets.
+Inboxes are protocols.mailbox.Mailbox instances, bounded and prioritized as configured.
+"""
+
+import os
+import queue
+import selectors
+import socket
+import threading
+from protocols.mailbox import Mailbox, MailboxFull
+from utils.logging import log_event, WARNING
+
+
+class Transport:
+    """Base transport: local agent inboxes plus get/get_many over them."""
+
+    def __init__(self, **mailbox_options):
+        """
+        :param mailbox_options: defaults for every agent's Mailbox (maxsize, policy, priorities,
+                                block_timeout); unbounded FIFO-per-priority if omitted
+        """
+        self.mailbox_options = mailbox_options
+        self.queues = {}  # local agent name -> Mailbox; replaced, never mutated (copy-on-write)
+        self.lock = threading.Lock()  # serializes registration only
+        # Set by A2AChannel: called with each message arriving from another process;
+        # returns True if it consumed the message (e.g. a response routed to a waiting future)
+        self.on_deliver = None
+
+    def register(self, agent_name: str, **mailbox_options):
+        """
+        Give a local agent an inbox; returns True if it was newly registered.
+        :param mailbox_options: overrides of the transport's mailbox defaults for this agent
+        """
+        with self.lock:
+            if agent_name in self.queues:
+                return False
+            queues = dict(self.queues)
+            queues[agent_name] = Mailbox(**{**self.mailbox_options, **mailbox_options})
+            self.queues = queues
+            return True
+
+    def inbox(self, agent_name: str, role: str = "Agent"):
+        q = self.queues.get(agent_name)
+        if q is None:
+            raise ValueError(f"{role} {agent_name} not registered")
+        return q
+
+    def is_registered(self, agent_name: str) -> bool:
+        return agent_name in self.queues
+
+    def agents(self):
+        """Names of every agent reachable through this transport."""
+        return list(self.queues)
+
+    def put(self, message):
+        raise NotImplementedError
+
+    def get(self, agent_name: str, block: bool = True, timeout: float = None):
+        """Next message for a local agent, or None if none arrives in time."""
+        try:
+            return self.inbox(agent_name).get(block=block, timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_many(self, agent_name: str, max_n: int, timeout: float = None):
+        """Wait up to timeout for one message (0: don't wait), then drain up to max_n without blocking."""
+        return self.inbox(agent_name).get_many(max_n, timeout)
+
+    def stats(self):
+        """Mailbox metrics of every local agent."""
+        return {name: mailbox.stats() for name, mailbox in self.queues.items()}
+
+    def _deliver(self, message):
+        """
+        Hand a message that arrived from elsewhere to the channel, else to the local inbox.
+        A "block" mailbox stalls the caller until there is room, which pushes back on the sender;
+        a message rejected here has nobody to report to and is only counted in the mailbox stats.
+        """
+        if self.on_deliver is not None and self.on_deliver(message):
+            return
+        q = self.queues.get(message.recipient)
+        if q is not None:
+            try:
+                q.put(message)
+            except MailboxFull:
+                pass
+
+    def close(self):
+        pass
+
+
+class InProcessTransport(Transport):
+    """Agents are threads of one process; messages are passed by reference."""
+
+    def put(self, message):
+        self.inbox(message.recipient, "Recipient").put(message)
+
+
+class UnixSocketTransport(Transport):
+    """
+    Agents may live in any process on the host that shares socket_dir.
+    Each local agent binds a datagram socket at <socket_dir>/<agent>.sock; one reader
+    thread per transport decodes incoming datagrams into the local inboxes. Messages
+    between local agents skip the socket entirely.
+    """
+
+    SUFFIX = ".sock"
+
+    def __init__(self, socket_dir: str, max_message_bytes: int = 65536, **mailbox_options):
+        """
+        :param socket_dir: directory shared by every process on the channel
+        :param max_message_bytes: largest encoded message accepted by put()
+        :param mailbox_options: defaults for local agents' mailboxes (see Transport)
+        """
+        super().__init__(**mailbox_options)
+        from protocols.a2a import A2AMessage  # imported here: protocols.a2a imports this module
+        self._decode = A2AMessage.from_bytes
+        self.socket_dir = socket_dir
+        self.max_message_bytes = max_message_bytes
+        os.makedirs(socket_dir, exist_ok=True)
+        self._sockets = {}  # local agent name -> bound receiving socket
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._selector = selectors.DefaultSelector()
+        self._reader = None
+        self._closed = False
+        self.read_errors = 0  # datagrams that could not be decoded or delivered
+
+    def _path(self, agent_name):
+        return os.path.join(self.socket_dir, agent_name + self.SUFFIX)
+
+    def register(self, agent_name: str, **mailbox_options):
+        if not super().register(agent_name, **mailbox_options):
+            return False
+        path = self._path(agent_name)
+        if os.path.exists(path):
+            os.unlink(path)  # left behind by a process that exited without closing
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        sock.setblocking(False)
+        self._sockets[agent_name] = sock
+        self._selector.register(sock, selectors.EVENT_READ)
+        if self._reader is None:
+            self._reader = threading.Thread(target=self._read, name="a2a-unix-reader", daemon=True)
+            self._reader.start()
+        return True
+
+    def is_registered(self, agent_name: str) -> bool:
+        return agent_name in self.queues or os.path.exists(self._path(agent_name))
+
+    def agents(self):
+        remote = [entry.name[:-len(self.SUFFIX)] for entry in os.scandir(self.socket_dir)
+                  if entry.name.endswith(self.SUFFIX)]
+        return list(dict.fromkeys(list(self.queues) + remote))
+
+    def put(self, message):
+        q = self.queues.get(message.recipient)
+        if q is not None:
+            q.put(message)
+            return
+        data = message.to_bytes()
+        if len(data) > self.max_message_bytes:
+            raise ValueError(f"Message of {len(data)} bytes exceeds max_message_bytes")
+        path = self._path(message.recipient)
+        try:
+            # Blocks while the recipient's socket buffer is full, which throttles fast senders
+            self._sender.sendto(data, path)
+        except FileNotFoundError:
+            raise ValueError(f"Recipient {message.recipient} not registered") from None
+        except ConnectionRefusedError:
+            # Nobody is bound to the socket any more: its process exited without closing
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            raise ValueError(f"Recipient {message.recipient} not registered") from None
+
+    def _read(self):
+        buffer_size = self.max_message_bytes
+        while not self._closed:
+            for key, _ in self._selector.select(timeout=0.5):
+                sock = key.fileobj
+                while True:
+                    try:
+                        data = sock.recv(buffer_size)
+                    except (BlockingIOError, OSError):
+                        break
+                    try:
+                        self._deliver(self._decode(data))
+                    except Exception as exc:
+                        # One bad datagram must not stop delivery for the whole process
+                        self.read_errors += 1
+                        log_event({"event": "a2a_read_error", "bytes": len(data), "error": repr(exc)},
+                                  level=WARNING)
+
+    def close(self):
+        """Stop the reader and remove this process's agent sockets."""
+        self._closed = True
+        if self._reader is not None:
+            self._reader.join()
+        for name, sock in self._sockets.items():
+            self._selector.unregister(sock)
+            sock.close()
+            try:
+                os.unlink(self._path(name))
+            except FileNotFoundError:
+                pass
+        self._sockets.clear()
+        self._sender.close()
+        self._selector.close()
+
+
+def _remote_channel(socket_dir):
+    from protocols.a2a import A2AChannel
+    return A2AChannel(UnixSocketTransport(socket_dir))
+
+
+def _echo_server(make_channel, count_events):
+    """Benchmark peer: answers requests, counts events and acknowledges every batch of count_events."""
+    from protocols.a2a import A2AMessage
+    channel = make_channel()
+    channel.register_agent("server")
+    events = 0
+    while True:
+        for msg in channel.receive_many("server", max_n=256, timeout=None):
+            if msg.msg_type == "request":
+                channel.reply(msg, msg.content)
+            elif msg.content.get("stop"):
+                return
+            else:
+                events += 1
+                if events == count_events:
+                    events = 0
+                    channel.send(A2AMessage("server", msg.sender, {"done": True}, "event"))
+
+
+if __name__ == "__main__":
+    # Benchmark: in-process queues vs. Unix sockets between two processes
+    import functools
+    import multiprocessing
+    import statistics
+    import tempfile
+    import time
+    from protocols.a2a import A2AChannel, A2AMessage
+    from utils.logging import configure
+
+    configure(path=os.devnull)  # inherited by the forked server process
+    EVENTS = 20000
+    CALLS = 2000
+
+    def bench(channel, start_server):
+        channel.register_agent("client")
+        server = start_server()
+        channel.call(A2AMessage("client", "server", {"warmup": True}), timeout=10)
+
+        start = time.perf_counter()
+        for n in range(EVENTS):
+            channel.send(A2AMessage("client", "server", {"n": n}, "event"))
+        channel.receive("client", timeout=60)  # the server's acknowledgement of the last event
+        throughput = EVENTS / (time.perf_counter() - start)
+
+        latencies = []
+        for n in range(CALLS):
+            start = time.perf_counter()
+            channel.call(A2AMessage("client", "server", {"n": n}), timeout=10)
+            latencies.append(time.perf_counter() - start)
+        channel.send(A2AMessage("client", "server", {"stop": True}, "event"))
+        server.join()
+        latencies.sort()
+        return throughput, statistics.median(latencies) * 1e6, latencies[int(CALLS * 0.99)] * 1e6
+
+    channel = A2AChannel()
+
+    def start_thread():
+        # Agents of one process share one channel
+        t = threading.Thread(target=_echo_server, args=(lambda: channel, EVENTS))
+        t.start()
+        return t
+    in_process = bench(channel, start_thread)
+    channel.close()
+
+    with tempfile.TemporaryDirectory() as socket_dir:
+        channel = _remote_channel(socket_dir)
+
+        def start_process():
+            make_channel = functools.partial(_remote_channel, socket_dir)
+            p = multiprocessing.Process(target=_echo_server, args=(make_channel, EVENTS))
+            p.start()
+            while not os.path.exists(os.path.join(socket_dir, "server.sock")):
+                time.sleep(0.01)
+            return p
+        unix_socket = bench(channel, start_process)
+        channel.close()
+
+    for name, (throughput, p50, p99) in (("in-process", in_process), ("unix socket", unix_socket)):
+        print(f"{name:12} {throughput:>10,.0f} msg/s   round trip p50 {p50:7.1f}us  p99 {p99:7.1f}us")
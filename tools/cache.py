@@ -0,0 +1,153 @@
+"""
+Result caching for ToolCoordinator.
+Tool methods opt in with @cacheable(ttl); methods that change state are marked
+@non_idempotent and can never be cached. Results live in an LRU+TTL cache keyed
+on a stable hash of (tool, method, params), and concurrent identical calls are
+coalesced so the tool runs once.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def cacheable(ttl: float = 60.0):
+    """Mark a tool method as safe to cache for `ttl` seconds."""
+    def mark(func):
+        if getattr(func, "non_idempotent", False):
+            raise ValueError(f"{func.__name__} is marked non-idempotent and cannot be cached")
+        func.cache_ttl = ttl
+        return func
+    return mark
+
+
+def non_idempotent(func):
+    """Mark a tool method as changing state: never cached, and it invalidates its tool's cached results."""
+    if getattr(func, "cache_ttl", None) is not None:
+        raise ValueError(f"{func.__name__} is marked cacheable and cannot be non-idempotent")
+    func.non_idempotent = True
+    return func
+
+
+def cache_key(tool_name, method, params) -> bytes:
+    """Stable digest of a call; params are serialized with sorted keys, so dict order does not matter."""
+    payload = json.dumps([tool_name, method, params], sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1024, clock=time.monotonic):
+        """
+        :param max_entries: entries kept before the least recently used are evicted
+        :param clock: time source for TTLs, in seconds
+        """
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, tool_name, value)
+        self._by_tool = {}  # tool_name -> set of keys
+        self._inflight = {}  # key -> (tool_name, Future of the call computing it)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_call(self, tool_name, method, params, ttl, func):
+        """
+        Return the cached result of a call, or run func() once to compute it.
+        Callers arriving while the same call is running wait for its result instead of running it again.
+        Exceptions are passed to every waiting caller and are not cached.
+        """
+        key = cache_key(tool_name, method, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                self._drop(key, entry[1])
+                self.expirations += 1
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                pending = Future()
+                self._inflight[key] = (tool_name, pending)
+                owner = True
+                self.misses += 1
+            else:
+                pending = inflight[1]
+                owner = False
+                self.coalesced += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            value = func()
+        except BaseException as exc:
+            with self._lock:
+                self._detach(key, pending)
+            pending.set_exception(exc)
+            raise
+        with self._lock:
+            # A result invalidated mid-flight is still returned, just not stored
+            if self._detach(key, pending):
+                self._store(key, tool_name, value, ttl)
+        pending.set_result(value)
+        return value
+
+    def _detach(self, key, pending):
+        """Stop coalescing onto a finished call; False if it was already invalidated."""
+        inflight = self._inflight.get(key)
+        if inflight is None or inflight[1] is not pending:
+            return False
+        del self._inflight[key]
+        return True
+
+    def _store(self, key, tool_name, value, ttl):
+        self._entries[key] = (self.clock() + ttl, tool_name, value)
+        self._entries.move_to_end(key)
+        self._by_tool.setdefault(tool_name, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, (_, old_tool, _) = self._entries.popitem(last=False)
+            self._forget(old_key, old_tool)
+            self.evictions += 1
+
+    def _drop(self, key, tool_name):
+        del self._entries[key]
+        self._forget(key, tool_name)
+
+    def _forget(self, key, tool_name):
+        keys = self._by_tool.get(tool_name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_tool[tool_name]
+
+    def invalidate(self, tool_name=None):
+        """Drop cached results of one tool (all tools if None), including calls still in flight."""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+                self._by_tool.clear()
+                self._inflight.clear()
+                return
+            for key in self._by_tool.pop(tool_name, ()):
+                del self._entries[key]
+            # In-flight calls may have read state from before the change; detach them so they are not stored
+            for key in [k for k, (tool, _) in self._inflight.items() if tool == tool_name]:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
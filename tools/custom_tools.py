@@ -2,22 +2,52 @@
 ERP-specific custom tools for specialized operations.
 """
 
-from utils.helpers import log_event
+import random
+
+from utils.logging import log_event, DEBUG
+from tools.cache import cacheable, non_idempotent
 
 
 class InventoryTool:
+    @non_idempotent
     def restock_item(self, item_id: str):
-        log_event({"tool": "InventoryTool", "event": "restock_item", "item_id": item_id})
+        log_event({"tool": "InventoryTool", "event": "restock_item", "item_id": item_id}, level=DEBUG)
         return f"Item {item_id} restocked successfully."
 
+    @cacheable(ttl=5.0)
+    def check_stock(self, item_id: str):
+        log_event({"tool": "InventoryTool", "event": "check_stock", "item_id": item_id}, level=DEBUG)
+        return f"Item {item_id} is in stock."
+
 
 class SalesTool:
+    @non_idempotent
     def process_order(self, order: dict):
-        log_event({"tool": "SalesTool", "event": "process_order", "order": order})
+        log_event({"tool": "SalesTool", "event": "process_order", "order": order}, level=DEBUG)
         return f"Order for {order['customer']} processed."
 
 
 class HRTool:
+    @non_idempotent
     def add_employee(self, employee: dict):
-        log_event({"tool": "HRTool", "event": "add_employee", "employee": employee})
+        log_event({"tool": "HRTool", "event": "add_employee", "employee": employee}, level=DEBUG)
         return f"Employee {employee['name']} added to HR system."
+
+
+class ForecastTool:
+    """CPU-bound demand simulation; runs in the coordinator's process pool."""
+    execution_mode = "process"
+
+    @cacheable(ttl=300.0)
+    def simulate_demand(self, item_id: str, history: list, horizon: int = 30, runs: int = 1000, seed: int = 0):
+        """
+        Bootstrap the demand distribution over `horizon` days by resampling daily history.
+        :return: dict with mean and 90th-percentile total demand
+        """
+        rng = random.Random(seed)
+        totals = sorted(sum(rng.choice(history) for _ in range(horizon)) for _ in range(runs))
+        return {
+            "item_id": item_id,
+            "mean": sum(totals) / runs,
+            "p90": totals[int(runs * 0.9)]
+        }
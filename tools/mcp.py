@@ -1,18 +1,121 @@
 """
 Multi-tool coordination logic.
 Allows agents to call multiple tools either sequentially, in parallel, or in loops.
+Parallel calls run on a long-lived thread pool owned by the coordinator, with
+optional per-tool concurrency caps ("lanes") so one slow tool cannot occupy
+every worker. Methods declared @cacheable are served from the coordinator's
+ResultCache. CPU-bound tools can run in a warm process pool instead, so they
+are not serialized by the GIL.
 """
 
-from utils.helpers import log_event
+from utils.logging import log_event, WARNING
+from tools.cache import ResultCache
+from utils.dispatch import DispatchTable
+from collections import deque, namedtuple
 import concurrent.futures
+import os
+import pickle
+import threading
+import time
+
+# Result of one parallel task; elapsed is the task's own run time in seconds
+TaskResult = namedtuple("TaskResult", ["tool", "result", "elapsed"])
+
+EXECUTION_MODES = ("thread", "process")
+
+# Tools of a process-pool worker, unpickled once when the worker starts
+_worker_dispatch = None
+
+
+def _init_worker(tools_blob):
+    global _worker_dispatch
+    _worker_dispatch = DispatchTable(pickle.loads(tools_blob))
+
+
+def _run_in_worker(tool_name, method, params):
+    # Params were validated by the parent coordinator
+    return _worker_dispatch.lookup(tool_name, method).func(**params)
+
+
+class _Lane:
+    """Admits at most `limit` running tasks for one tool; the rest wait in FIFO order."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.pending = deque()
 
 
 class ToolCoordinator:
-    def __init__(self, tools: dict):
+    def __init__(self, tools: dict, max_workers: int = None, tool_limits: dict = None,
+                 default_timeout: float = None, cache: ResultCache = None, cache_policy: dict = None,
+                 execution_modes: dict = None, process_workers: int = None):
         """
         :param tools: dict of available tool instances {tool_name: tool_object}
+        :param max_workers: size of the shared worker pool (default: min(32, CPUs + 4))
+        :param tool_limits: optional {tool_name: max concurrent calls} caps
+        :param default_timeout: seconds run_parallel waits for each task unless told otherwise
+        :param cache: result cache for cacheable methods (a default ResultCache is created)
+        :param cache_policy: optional {tool_name: {method: ttl}} for tools that can't be decorated;
+                             overrides @cacheable TTLs, and a ttl of None disables caching
+        :param execution_modes: optional {tool_name: "thread" | "process"}; overrides a tool's
+                                `execution_mode` class attribute (default "thread"). Tools with
+                                @non_idempotent methods are stateful and cannot run in processes.
+        :param process_workers: size of the process pool (default: number of CPUs)
         """
         self.tools = tools
+        self.dispatch = DispatchTable(tools)
+        self.cache = cache if cache is not None else ResultCache()
+        self.cache_policy = cache_policy or {}
+        for tool_name, methods in self.cache_policy.items():
+            for method, ttl in methods.items():
+                handler = self.dispatch.lookup(tool_name, method)
+                if ttl is not None and handler is not None and handler.non_idempotent:
+                    raise ValueError(f"{tool_name}.{method} is non-idempotent and cannot be cached")
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.default_timeout = default_timeout
+        self._lanes = {name: _Lane(limit) for name, limit in (tool_limits or {}).items()}
+        self._lane_lock = threading.Lock()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._inflight = set()  # futures not yet resolved
+        self.execution_modes = execution_modes or {}
+        for tool_name, mode in self.execution_modes.items():
+            self._check_mode(mode)
+            if mode == "process" and self._stateful(tool_name):
+                raise ValueError(f"{tool_name} has non-idempotent methods and cannot run in a process pool")
+        self.process_workers = process_workers or os.cpu_count() or 1
+        self._process_pool = None
+        self._process_tools = None  # tools that pickled successfully, set when the pool starts
+
+    def _stateful(self, tool_name):
+        """A tool with state-changing methods: worker copies of it would go stale after a write."""
+        return any(handler.non_idempotent for handler in self.dispatch.handlers(tool_name))
+
+    @staticmethod
+    def _check_mode(mode):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode {mode!r}; expected one of {EXECUTION_MODES}")
+
+    @property
+    def executor(self):
+        """The coordinator's worker pool, created on first use and reused afterwards."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="tool")
+        return self._executor
+
+    def set_tool_limit(self, tool_name: str, limit: int):
+        """Cap concurrent calls to one tool; tasks over the cap queue without holding a worker."""
+        with self._lane_lock:
+            lane = self._lanes.get(tool_name)
+            if lane is None:
+                self._lanes[tool_name] = _Lane(limit)
+            else:
+                lane.limit = limit
+        self._drain(tool_name)
 
     def run_sequential(self, tasks: list):
         """
@@ -25,26 +128,134 @@ class ToolCoordinator:
             if not tool:
                 results.append((tool_name, "Tool not found"))
                 continue
-            func = getattr(tool, method, None)
-            if callable(func):
-                results.append((tool_name, func(**params)))
-            else:
-                results.append((tool_name, f"Method {method} not implemented"))
+            results.append((tool_name, self._run_task(tool_name, method, params)))
         log_event({"event": "tools_sequential", "results": results})
         return results
 
-    def run_parallel(self, tasks: list):
+    @property
+    def process_pool(self):
         """
-        Run tools in parallel using threads.
+        Warm process pool, created on first use.
+        Every picklable, stateless tool is shipped to each worker once, at startup; tasks then
+        only carry (tool, method, params). Other tools keep running on threads: a worker's copy
+        of a stateful tool would not see writes made to ours.
         """
+        if self._process_pool is None:
+            with self._executor_lock:
+                if self._process_pool is None:
+                    picklable = {}
+                    for name, tool in self.tools.items():
+                        if self._stateful(name):
+                            continue
+                        try:
+                            pickle.dumps(tool, protocol=pickle.HIGHEST_PROTOCOL)
+                        except Exception:
+                            log_event({"event": "tool_not_picklable", "tool": name}, level=WARNING)
+                            continue
+                        picklable[name] = tool
+                    self._process_tools = frozenset(picklable)
+                    self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.process_workers, initializer=_init_worker,
+                        initargs=(pickle.dumps(picklable, protocol=pickle.HIGHEST_PROTOCOL),))
+        return self._process_pool
+
+    def _execution_mode(self, handler, mode=None):
+        """Where a call runs: the requested mode, else the tool's declared mode; stateful tools stay local."""
+        if mode is None:
+            mode = self.execution_modes.get(handler.target)
+            if mode is None:
+                mode = getattr(handler.owner, "execution_mode", "thread")
+        if mode == "process":
+            self.process_pool
+            if handler.target not in self._process_tools:
+                return "thread"
+        return mode
+
+    def submit(self, tool_name, method, params, mode: str = None) -> concurrent.futures.Future:
+        """
+        Schedule one task on the pool and return its future, resolving to a TaskResult.
+        Cancelling the future before the task starts removes it, even while it waits for its tool's lane.
+        :param mode: "thread" or "process"; defaults to the tool's execution mode
+        """
+        if mode is not None:
+            self._check_mode(mode)
+        future = concurrent.futures.Future()
+        with self._lane_lock:
+            self._inflight.add(future)
+        future.add_done_callback(self._forget)
+        job = (future, tool_name, method, params, mode)
+        lane = self._lanes.get(tool_name)
+        if lane is None:
+            self.executor.submit(self._run_job, job)
+            return future
+        with self._lane_lock:
+            lane.pending.append(job)
+        self._drain(tool_name)
+        return future
+
+    def _forget(self, future):
+        with self._lane_lock:
+            self._inflight.discard(future)
+
+    def _drain(self, tool_name):
+        """Start queued tasks of a capped tool while it has free slots."""
+        lane = self._lanes[tool_name]
+        while True:
+            with self._lane_lock:
+                if lane.active >= lane.limit or not lane.pending:
+                    return
+                job = lane.pending.popleft()
+                if job[0].cancelled():
+                    continue
+                lane.active += 1
+            self.executor.submit(self._run_job, job, lane)
+
+    def _run_job(self, job, lane=None):
+        """
+        :param lane: the lane whose slot this task holds; None if it was submitted uncapped,
+                     even if a cap was set on its tool since
+        """
+        future, tool_name, method, params, mode = job
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            start = time.perf_counter()
+            try:
+                result = self._run_task(tool_name, method, params, mode)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(TaskResult(tool_name, result, time.perf_counter() - start))
+        finally:
+            if lane is not None:
+                with self._lane_lock:
+                    lane.active -= 1
+                self._drain(tool_name)
+
+    def run_parallel(self, tasks: list, timeout: float = None, mode: str = None):
+        """
+        Run tools in parallel on the coordinator's pool.
+        :param tasks: list of (tool_name, method, params)
+        :param timeout: seconds to wait for each task, counted from submission
+                        (default_timeout if omitted); late tasks are cancelled if not yet started
+        :param mode: "process" runs every task that can in the process pool, "thread" keeps all
+                     on threads; by default each tool's declared execution mode is used
+        :return: list of TaskResult(tool, result, elapsed) in the same order as tasks
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        futures = [self.submit(tool_name, method, params, mode) for tool_name, method, params in tasks]
         results = []
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future_map = {
-                executor.submit(self._run_task, tool_name, method, params): tool_name
-                for tool_name, method, params in tasks
-            }
-            for future in concurrent.futures.as_completed(future_map):
-                results.append((future_map[future], future.result()))
+        for future, (tool_name, _, _) in zip(futures, tasks):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                results.append(future.result(timeout=remaining))
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                results.append(TaskResult(tool_name, f"Timed out after {timeout}s", None))
+            except concurrent.futures.CancelledError:
+                results.append(TaskResult(tool_name, "Cancelled", None))
         log_event({"event": "tools_parallel", "results": results})
         return results
 
@@ -59,11 +270,94 @@ class ToolCoordinator:
         log_event({"event": "tools_loop", "results": results})
         return results
 
-    def _run_task(self, tool_name, method, params):
-        tool = self.tools.get(tool_name)
-        if not tool:
-            return f"{tool_name} not found"
-        func = getattr(tool, method, None)
-        if callable(func):
-            return func(**params)
-        return f"Method {method} not implemented"
+    def cancel_pending(self):
+        """Cancel every submitted task that has not started yet; returns how many were cancelled."""
+        with self._lane_lock:
+            futures = list(self._inflight)
+            for lane in self._lanes.values():
+                lane.pending.clear()
+        return sum(future.cancel() for future in futures)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop the worker pool; a later call re-creates it."""
+        if cancel_pending:
+            self.cancel_pending()
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+            process_pool, self._process_pool = self._process_pool, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if process_pool is not None:
+            process_pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _cache_ttl(self, handler):
+        methods = self.cache_policy.get(handler.target)
+        if methods is not None and handler.name in methods:
+            return methods[handler.name]
+        return handler.cache_ttl
+
+    def _run_task(self, tool_name, method, params, mode=None):
+        handler = self.dispatch.lookup(tool_name, method)
+        if handler is None:
+            if not self.tools.get(tool_name):
+                return f"{tool_name} not found"
+            return f"Method {method} not implemented"
+        error = handler.check(params)
+        if error:
+            return f"Parameter mismatch: {error}"
+        func = handler.func
+        if self._execution_mode(handler, mode) == "process":
+            def func(**params):
+                return self.process_pool.submit(_run_in_worker, tool_name, method, params).result()
+        ttl = self._cache_ttl(handler)
+        if ttl is not None:
+            return self.cache.get_or_call(tool_name, method, params, ttl, lambda: func(**params))
+        result = func(**params)
+        if handler.non_idempotent:
+            # The tool's state changed, so its cached reads are stale
+            self.cache.invalidate(tool_name)
+        return result
+
+    def cache_stats(self):
+        """Hit/miss/coalesced/eviction counters of the coordinator's result cache."""
+        return self.cache.stats()
+
+
+if __name__ == "__main__":
+    # Benchmark: a CPU-bound tool on threads vs. warm worker processes
+    from tools.custom_tools import ForecastTool
+    from utils.logging import configure
+    import random
+
+    configure(path=os.devnull)  # inherited by the worker processes
+    rng = random.Random(0)
+    history = [rng.randint(0, 50) for _ in range(365)]
+    tasks = [("forecast", "simulate_demand",
+              {"item_id": f"SKU{i}", "history": history, "horizon": 30, "runs": 400, "seed": i})
+             for i in range(32)]
+
+    def bench(coordinator, mode):
+        coordinator.run_parallel(tasks[:coordinator.process_workers], mode=mode)  # warm the pools
+        start = time.perf_counter()
+        results = coordinator.run_parallel(tasks, mode=mode)
+        return time.perf_counter() - start, results
+
+    cpus = os.cpu_count() or 1
+    uncached = {"forecast": {"simulate_demand": None}}
+    with ToolCoordinator({"forecast": ForecastTool()}, cache_policy=uncached) as coordinator:
+        baseline, expected = bench(coordinator, "thread")
+    print(f"threads: {baseline:.2f}s for {len(tasks)} tasks ({cpus} CPUs)")
+    for workers in sorted({1, 2, 4, cpus}):
+        if workers > cpus:
+            continue
+        with ToolCoordinator({"forecast": ForecastTool()}, cache_policy=uncached,
+                             process_workers=workers) as coordinator:
+            elapsed, results = bench(coordinator, "process")
+        assert [r.result for r in results] == [r.result for r in expected]
+        print(f"processes x{workers}: {elapsed:.2f}s, speedup {baseline / elapsed:.1f}x")
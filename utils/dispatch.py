@@ -0,0 +1,130 @@
+"""
+Dispatch table for agent modules and tools.
+Public methods are resolved to bound callables once, with their signatures
+precomputed, so a call costs a few dict lookups instead of getattr/callable
+reflection. Each handler remembers the object it is bound to, and a handler whose
+target has since been replaced or removed in the targets dict is rebuilt or dropped. Callers invoke the handler directly and consult its signature only
+when the call raises TypeError, to tell bad parameters apart from a TypeError
+raised inside the method.
+"""
+
+import inspect
+import types
+
+_METHOD_TYPES = (types.FunctionType, staticmethod, classmethod, types.BuiltinFunctionType)
+
+
+class Handler:
+    """A bound callable with its accepted and required keyword parameters."""
+    __slots__ = ("target", "name", "owner", "func", "required", "accepted", "exact",
+                 "cache_ttl", "non_idempotent")
+
+    def __init__(self, target: str, name: str, owner, func):
+        self.target = target
+        self.owner = owner
+        self.name = name
+        self.func = func
+        self.cache_ttl = getattr(func, "cache_ttl", None)
+        self.non_idempotent = getattr(func, "non_idempotent", False)
+        required, accepted = set(), set()
+        try:
+            parameters = inspect.signature(func).parameters.values()
+        except (TypeError, ValueError):
+            parameters = None  # no introspectable signature: accept anything
+        for p in parameters or ():
+            if p.kind is p.VAR_KEYWORD:
+                accepted = None
+            elif p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY):
+                if accepted is not None:
+                    accepted.add(p.name)
+                if p.default is p.empty:
+                    required.add(p.name)
+            elif p.kind is p.POSITIONAL_ONLY and p.default is p.empty:
+                required.add(p.name)  # can never be satisfied by keyword params
+        self.required = frozenset(required)
+        self.accepted = None if parameters is None or accepted is None else frozenset(accepted)
+        # Without optional parameters a single comparison validates the call
+        self.exact = self.accepted is not None and self.accepted == self.required
+
+    def check(self, params: dict):
+        """Return a description of what is wrong with params, or None if the call is valid."""
+        keys = params.keys()
+        if self.exact:
+            if keys == self.accepted:
+                return None
+        elif self.accepted is None:
+            if not self.required or self.required <= keys:
+                return None
+        elif self.accepted.issuperset(keys) and (not self.required or self.required <= keys):
+            return None
+        problems = []
+        missing = sorted(self.required - keys)
+        if missing:
+            problems.append("missing " + ", ".join(repr(k) for k in missing))
+        if self.accepted is not None:
+            unexpected = sorted(keys - self.accepted)
+            if unexpected:
+                problems.append("unexpected " + ", ".join(repr(k) for k in unexpected))
+        return f"{self.target}.{self.name}() " + "; ".join(problems)
+
+
+class DispatchTable:
+    def __init__(self, targets: dict):
+        """
+        :param targets: {name: module or tool object}; kept by reference, so targets added,
+                        replaced or removed later are picked up on the next lookup
+        """
+        self.targets = targets
+        self.table = {}  # target name -> {method name: Handler}
+        self.owners = {}  # target name -> object the table's handlers are bound to
+        for name, obj in targets.items():
+            self.register(name, obj)
+
+    def register(self, name: str, obj):
+        """Bind every public method of obj, replacing handlers bound to a previous object."""
+        handlers = {}
+        for attr in dir(type(obj)):
+            if attr.startswith("_"):
+                continue
+            # Look up statically so properties are not evaluated
+            if isinstance(inspect.getattr_static(obj, attr), _METHOD_TYPES):
+                handlers[attr] = Handler(name, attr, obj, getattr(obj, attr))
+        self.table[name] = handlers
+        self.owners[name] = obj
+
+    def handlers(self, name: str):
+        """Handlers registered for one target."""
+        return list(self.table.get(name, {}).values())
+
+    def unregister(self, name: str):
+        self.table.pop(name, None)
+        self.owners.pop(name, None)
+
+    def lookup(self, target: str, method: str):
+        """
+        Return the Handler for target.method, or None if the target or method does not exist.
+        Targets added to the targets dict since construction, and methods not found at
+        registration (private or instance-level callables), are resolved and cached on first use;
+        a target replaced in the dict is registered again.
+        """
+        obj = self.targets.get(target)
+        try:
+            handler = self.table[target][method]
+            if handler.owner is obj:
+                return handler
+        except KeyError:
+            pass
+        if obj is None:
+            self.unregister(target)
+            return None
+        handlers = self.table.get(target)
+        if handlers is None or self.owners.get(target) is not obj:
+            self.register(target, obj)
+            handlers = self.table[target]
+            if method in handlers:
+                return handlers[method]
+        func = getattr(obj, method, None)
+        if not callable(func):
+            return None
+        handler = handlers[method] = Handler(target, method, obj, func)
+        return handler
@@ -1,16 +1,23 @@
-import datetime
+from utils import logging as _logging
 
-def log_event(entry):
+def log_event(entry, level=_logging.INFO):
     """
-    Log events with timestamp (console for simplicity).
+    Log events through the shared logging pipeline (see utils.logging).
     """
-    timestamp = datetime.datetime.now().isoformat()
-    print(f"[{timestamp}] LOG: {entry}")
+    _logging.log_event(entry, level=level)
 
-def calculate_metric(metric_name, data):
+def calculate_metric(metric_name, data=None, engine=None):
     """
     Example KPI calculation.
+    With a KPIEngine, any registered metric is read from its aggregates in O(1)
+    instead of being recomputed from module data.
     """
+    if engine is not None:
+        try:
+            return {"status": "success", "metric": metric_name, "value": engine.value(metric_name)}
+        except KeyError:
+            return {"status": "error", "message": "Unknown metric"}
+    data = data or {}
     if metric_name == "employee_count":
         return {"status": "success", "metric": metric_name, "value": len(data.get("employees", {}))}
     elif metric_name == "total_orders":
@@ -0,0 +1,155 @@
+"""
+Event-driven KPI aggregates.
+ERP modules publish change events to a KPIEngine, which folds each one into
+materialized aggregates in O(1) per affected key. Named metrics are read from
+a registry without touching module state, so dashboards can poll cheaply.
+"""
+
+import threading
+from collections import defaultdict
+
+# Events published by the ERP modules and their payloads
+ORDER_CREATED = "order_created"  # order_id, customer, status, items
+ORDER_STATUS_CHANGED = "order_status_changed"  # order_id, old_status, new_status
+ORDER_CANCELLED = "order_cancelled"  # order_id, status, items
+STOCK_CHANGED = "stock_changed"  # item_ids, deltas (aligned)
+EMPLOYEE_ADDED = "employee_added"  # employee_id, role
+EMPLOYEE_UPDATED = "employee_updated"  # employee_id, old_role, new_role
+EMPLOYEE_REMOVED = "employee_removed"  # employee_id, role
+
+
+class KPIEngine:
+    def __init__(self, unit_prices=None):
+        """
+        :param unit_prices: optional {item_id: unit price} used for stock value
+        """
+        self.total_orders = 0
+        self.orders_by_status = defaultdict(int)
+        self.units_ordered = defaultdict(int)  # item_id -> units on live orders
+        self.units_in_stock = defaultdict(int)  # item_id -> available units
+        self.stock_value = 0.0
+        self.unit_prices = dict(unit_prices or {})
+        self.headcount = 0
+        self.headcount_by_role = defaultdict(int)
+
+        self._handlers = defaultdict(list)
+        self._metrics = {}
+        self._lock = threading.RLock()
+
+        self.subscribe(ORDER_CREATED, self._order_created)
+        self.subscribe(ORDER_STATUS_CHANGED, self._order_status_changed)
+        self.subscribe(ORDER_CANCELLED, self._order_cancelled)
+        self.subscribe(STOCK_CHANGED, self._stock_changed)
+        self.subscribe(EMPLOYEE_ADDED, self._employee_added)
+        self.subscribe(EMPLOYEE_UPDATED, self._employee_updated)
+        self.subscribe(EMPLOYEE_REMOVED, self._employee_removed)
+
+        self.register("total_orders", lambda key=None: self.total_orders)
+        self.register("employee_count", lambda key=None: self.headcount)
+        self.register("stock_value", lambda key=None: self.stock_value)
+        self.register("orders_by_status", self._keyed(self.orders_by_status))
+        self.register("units_ordered", self._keyed(self.units_ordered))
+        self.register("units_in_stock", self._keyed(self.units_in_stock))
+        self.register("headcount_by_role", self._keyed(self.headcount_by_role))
+
+    # --- Publishing ---
+
+    def subscribe(self, event, handler):
+        """
+        Call handler(**payload) for every published event of this type.
+        """
+        self._handlers[event].append(handler)
+
+    def publish(self, event, **payload):
+        """
+        Fold one change event into the aggregates.
+        """
+        handlers = self._handlers.get(event)
+        if not handlers:
+            return
+        with self._lock:
+            for handler in handlers:
+                handler(**payload)
+
+    # --- Metric registry ---
+
+    def register(self, name, fn):
+        """
+        Register a named metric; fn(key=None) must answer from aggregates, not module state.
+        """
+        self._metrics[name] = fn
+
+    def metrics(self):
+        return list(self._metrics)
+
+    def value(self, name, key=None):
+        """
+        Current value of a registered metric, or of one key of a keyed metric
+        (e.g. value("orders_by_status", "open")). Raises KeyError for unknown metrics.
+        """
+        with self._lock:
+            return self._metrics[name](key)
+
+    def snapshot(self):
+        """All metrics at once, as a consistent copy."""
+        with self._lock:
+            return {name: fn() for name, fn in self._metrics.items()}
+
+    @staticmethod
+    def _keyed(counts):
+        def metric(key=None):
+            return dict(counts) if key is None else counts.get(key, 0)
+        return metric
+
+    def set_unit_price(self, item_id, price):
+        """
+        Set an item's unit price, revaluing its stock in O(1).
+        """
+        with self._lock:
+            old = self.unit_prices.get(item_id, 0)
+            self.stock_value += self.units_in_stock.get(item_id, 0) * (price - old)
+            self.unit_prices[item_id] = price
+
+    # --- Aggregate maintenance ---
+
+    @staticmethod
+    def _adjust(counts, key, delta):
+        value = counts[key] + delta
+        if value:
+            counts[key] = value
+        else:
+            del counts[key]
+
+    def _order_created(self, order_id, customer, status, items):
+        self.total_orders += 1
+        self._adjust(self.orders_by_status, status, 1)
+        for line in items:
+            self._adjust(self.units_ordered, line["item_id"], line.get("qty", 1))
+
+    def _order_status_changed(self, order_id, old_status, new_status):
+        self._adjust(self.orders_by_status, old_status, -1)
+        self._adjust(self.orders_by_status, new_status, 1)
+
+    def _order_cancelled(self, order_id, status, items):
+        self.total_orders -= 1
+        self._adjust(self.orders_by_status, status, -1)
+        for line in items:
+            self._adjust(self.units_ordered, line["item_id"], -line.get("qty", 1))
+
+    def _stock_changed(self, item_ids, deltas):
+        for item_id, delta in zip(item_ids, deltas):
+            self._adjust(self.units_in_stock, item_id, delta)
+            self.stock_value += delta * self.unit_prices.get(item_id, 0)
+
+    def _employee_added(self, employee_id, role):
+        self.headcount += 1
+        self._adjust(self.headcount_by_role, role, 1)
+
+    def _employee_updated(self, employee_id, old_role, new_role):
+        if old_role != new_role:
+            self._adjust(self.headcount_by_role, old_role, -1)
+            self._adjust(self.headcount_by_role, new_role, 1)
+
+    def _employee_removed(self, employee_id, role):
+        self.headcount -= 1
+        self._adjust(self.headcount_by_role, role, -1)